@@ -1,12 +1,31 @@
+import importlib
+import os
 import streamlit as st
-import firebase_admin
 from firebase_config import get_db
 from utils.auth import check_authentication
 from components.sidebar import render_sidebar
-from functions import (
-    home, patient_dashboard, doctor_dashboard, admin_dashboard,
-    appointment, disease_predictor, blog, scans, video_call, patient_report_analysis, history, chatbot
-)
+from utils.model_registry import warmup_models
+
+# Page modules are imported the first time they are visited, so TensorFlow,
+# Vosk, google-genai and scikit-learn load only with the pages that use them.
+# Check the startup cost with: python -m benchmarks.startup
+PAGE_MODULES = {
+    'home': 'functions.home',
+    'patient_dashboard': 'functions.patient_dashboard',
+    'doctor_dashboard': 'functions.doctor_dashboard',
+    'admin_dashboard': 'functions.admin_dashboard',
+    'appointment': 'functions.appointment',
+    'disease_predictor': 'functions.disease_predictor',
+    'blog': 'functions.blog',
+    'scans': 'functions.scans',
+    'video_call': 'functions.video_call',
+    'patient_report_analysis': 'functions.patient_report_analysis',
+    'history': 'functions.history',
+    'chatbot': 'functions.chatbot'
+}
+
+def load_page(name):
+    return importlib.import_module(PAGE_MODULES[name])
 
 st.set_page_config(
     page_title="MedAI - Healthcare Management System",
@@ -17,6 +36,12 @@ st.set_page_config(
 
 db = get_db()
 
+# Optionally load models in the background as soon as the server starts:
+# MEDAI_WARMUP_MODELS=all, or a comma-separated list such as "disease_symptoms,brain_tumor"
+warmup_setting = os.environ.get("MEDAI_WARMUP_MODELS", "").strip()
+if warmup_setting and warmup_setting != "0":
+    warmup_models(None if warmup_setting in ("1", "all") else [name.strip() for name in warmup_setting.split(",")])
+
 def init_session_state():
     defaults = {
         'user': None,
@@ -37,30 +62,20 @@ def main():
     
     render_sidebar()
     
-    page_map = {
-        'home': home,
-        'patient_dashboard': patient_dashboard,
-        'doctor_dashboard': doctor_dashboard,
-        'admin_dashboard': admin_dashboard,
-        'appointment': appointment,
-        'disease_predictor': disease_predictor,
-        'blog': blog,
-        'scans': scans,
-        'video_call': video_call,
-        'patient_report_analysis': patient_report_analysis,
-        'history': history,
-        'chatbot': chatbot
-    }
-    
     if not check_authentication():
-        home.show()
+        load_page('home').show()
     else:
         current_page = st.session_state.current_page
-        if current_page in page_map:
-            page_map[current_page].show()
+        if current_page in PAGE_MODULES:
+            try:
+                page = load_page(current_page)
+            except ImportError as e:
+                st.error(f"This page is unavailable because a dependency could not be loaded. Error: {e}")
+                return
+            page.show()
         else:
             st.error("Page not found")
-            home.show()
+            load_page('home').show()
 
 if __name__ == "__main__":
     main()
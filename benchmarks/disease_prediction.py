@@ -0,0 +1,193 @@
+'''
+Benchmark for the disease-prediction hot path, using Training.csv rows as
+the workload. Runs fully offline and writes a JSON report.
+
+    python -m benchmarks.disease_prediction [--backend numpy|sklearn] [--output FILE]
+'''
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from utils.symptom_vocabulary import load_vocabulary
+
+CSV_PATH = "./models/csv/Training.csv"
+RESULTS_DIR = "./benchmarks/results"
+
+# Runs in a fresh interpreter so import and first-call costs are really cold
+COLD_START_SCRIPT = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from utils import disease_prediction
+import_seconds = time.perf_counter() - start
+start = time.perf_counter()
+disease_prediction.predict_disease(sys.argv[1].split(","))
+first_call_seconds = time.perf_counter() - start
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "first_call_seconds": first_call_seconds,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "backend": disease_prediction.model_status()["backend"],
+}))
+'''
+
+def load_workload(csv_path=CSV_PATH):
+    '''Symptom lists taken from the rows of the training data.'''
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        # Map raw header positions onto the (de-duplicated) vocabulary names
+        columns = load_vocabulary()["columns"]
+        positions = [i for i, name in enumerate(header) if name != "prognosis" and name.strip()]
+        workload = []
+        for row in reader:
+            if row:
+                workload.append([columns[j] for j, i in enumerate(positions) if row[i] == "1"])
+    return workload
+
+def percentiles_ms(samples):
+    samples = sorted(samples)
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": samples[-1] * 1000,
+    }
+
+def peak_rss_mb(kilobytes):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return kilobytes / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def measure_cold_start(symptoms, runs, env):
+    results = []
+    for _ in range(runs):
+        run = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT, ",".join(symptoms)],
+            capture_output=True, text=True, env=env,
+        )
+        if run.returncode != 0:
+            lines = run.stderr.strip().splitlines()
+            raise RuntimeError(f"cold-start run failed: {lines[-1] if lines else f'exit code {run.returncode}'}")
+        results.append(json.loads(run.stdout.strip().splitlines()[-1]))
+    return {
+        "runs": runs,
+        "backend": results[0]["backend"],
+        "import": percentiles_ms([r["import_seconds"] for r in results]),
+        "first_call": percentiles_ms([r["first_call_seconds"] for r in results]),
+        "peak_rss_mb": max(peak_rss_mb(r["peak_rss_kb"]) for r in results),
+    }
+
+def measure_single_calls(disease_prediction, workload, calls):
+    # Bypass the result cache to time the model itself, then time the cached path
+    uncached = []
+    for symptoms in workload[:calls]:
+        start = time.perf_counter()
+        disease_prediction.predict_disease_batch([symptoms])
+        uncached.append(time.perf_counter() - start)
+    disease_prediction.prediction_cache.clear()
+    cached = []
+    for symptoms in workload[:calls]:
+        start = time.perf_counter()
+        disease_prediction.predict_disease(symptoms)
+        cached.append(time.perf_counter() - start)
+    return {
+        "uncached": percentiles_ms(uncached),
+        "predict_disease": percentiles_ms(cached),
+        "cache": disease_prediction.prediction_cache_stats(),
+    }
+
+def measure_batches(disease_prediction, workload, batch_sizes, repeats):
+    results = []
+    for batch_size in batch_sizes:
+        batch = workload[:batch_size]
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            disease_prediction.predict_disease_batch(batch)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({
+            "batch_size": len(batch),
+            "best_ms": best * 1000,
+            "rows_per_second": len(batch) / best,
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark utils.disease_prediction.")
+    parser.add_argument("--backend", choices=["auto", "numpy", "sklearn"], default="auto")
+    parser.add_argument("--cold-runs", type=int, default=5, help="fresh interpreters for import/first-call timing")
+    parser.add_argument("--calls", type=int, default=2000, help="single calls for p50/p99 latency")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 128, 1024, 4920])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    # The backend switch is read at import time, so set it before importing
+    env = dict(os.environ)
+    if args.backend != "auto":
+        env["MEDAI_COMPILED_MODEL"] = "1" if args.backend == "numpy" else "0"
+        os.environ["MEDAI_COMPILED_MODEL"] = env["MEDAI_COMPILED_MODEL"]
+
+    from utils import disease_prediction
+
+    try:
+        disease_prediction.require_model()
+    except disease_prediction.ModelUnavailableError as e:
+        print(f"Cannot benchmark: {e}. Train or copy the model into models/pkl first.")
+        return 1
+
+    workload = load_workload()
+    random.Random(args.seed).shuffle(workload)
+    report = {
+        "benchmark": "disease_prediction",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "workload": {"source": CSV_PATH, "rows": len(workload), "seed": args.seed},
+        "cold_start": measure_cold_start(workload[0], args.cold_runs, env),
+    }
+
+    disease_prediction.warmup(background=False)
+    report["model"] = disease_prediction.model_status()
+    report["single_call"] = measure_single_calls(disease_prediction, workload, args.calls)
+    report["batch"] = measure_batches(disease_prediction, workload, args.batch_sizes, args.repeats)
+    report["peak_rss_mb"] = peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"disease_prediction-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    single = report["single_call"]["uncached"]
+    print(f"backend:        {report['model']['backend']}")
+    print(f"cold import:    {report['cold_start']['import']['p50_ms']:.1f} ms")
+    print(f"first call:     {report['cold_start']['first_call']['p50_ms']:.1f} ms")
+    print(f"single call:    p50 {single['p50_ms']:.3f} ms, p99 {single['p99_ms']:.3f} ms")
+    for batch in report["batch"]:
+        print(f"batch {batch['batch_size']:>5}:    {batch['rows_per_second']:,.0f} rows/s")
+    print(f"peak RSS:       {report['peak_rss_mb']:.1f} MB")
+    print(f"report:         {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+'''
+Benchmark for scan decode + preprocessing, comparing the original
+full-resolution pipeline with the draft-mode decode that writes into a
+preallocated batch. Synthetic JPEG, RGB PNG and grayscale PNG images of
+several sizes are generated, so it runs fully offline. Peak memory is
+measured in a fresh interpreter per case.
+
+    python -m benchmarks.image_preprocessing [--megapixels 1 4 12 24] [--output FILE]
+'''
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from PIL import Image
+
+from benchmarks.disease_prediction import peak_rss_mb, percentiles_ms
+from utils.model_registry import current_rss_mb
+from utils.scan_models import decode_scan_image, fill_scan_array
+
+RESULTS_DIR = "./benchmarks/results"
+TARGET_SIZE = (224, 224)
+FORMATS = {
+    "jpeg_rgb": ("RGB", "JPEG", ".jpg"),
+    "png_rgb": ("RGB", "PNG", ".png"),
+    "png_gray": ("L", "PNG", ".png"),
+}
+
+def legacy_pipeline(path):
+    '''The pipeline before the fast path, without the pass-through EfficientNet preprocess_input.'''
+    image = Image.open(path).convert("RGB")
+    image = image.resize(TARGET_SIZE)
+    img_array = np.array(image)
+    if img_array.ndim == 2:
+        img_array = np.stack([img_array] * 3, axis=-1)
+    img_array = img_array[..., :3]
+    img_array = np.expand_dims(img_array, axis=0)
+    return img_array.astype(np.float32)
+
+def fast_pipeline(path, out=None):
+    if out is None:
+        out = np.empty((1, *TARGET_SIZE, 3), dtype=np.float32)
+    fill_scan_array(decode_scan_image(path, TARGET_SIZE), out[0])
+    return out
+
+PIPELINES = {"legacy": legacy_pipeline, "fast": fast_pipeline}
+
+def high_water_mb():
+    '''
+    Peak RSS of this process. VmHWM starts fresh at exec, unlike ru_maxrss
+    which on Linux keeps the parent's peak from before the fork.
+    '''
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+# Runs in a fresh interpreter so the peak RSS belongs to one decode only
+PEAK_MEMORY_SCRIPT = '''
+import json, sys
+from benchmarks.image_preprocessing import PIPELINES, current_rss_mb, high_water_mb
+baseline = current_rss_mb()
+PIPELINES[sys.argv[1]](sys.argv[2])
+print(json.dumps({"extra_peak_mb": high_water_mb() - baseline}))
+'''
+
+def make_image(path, megapixels, mode, image_format, seed=0):
+    '''Smooth gradients plus noise, so JPEG and PNG compress like real scans rather than flat color.'''
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = 128 + 60 * np.sin(x / 97.0) * np.cos(y / 53.0)
+    noise = rng.normal(0, 12, size=(height, width)).astype(np.float32)
+    gray = np.clip(base + noise, 0, 255).astype(np.uint8)
+    if mode == "L":
+        image = Image.fromarray(gray, "L")
+    else:
+        image = Image.fromarray(np.stack([gray, np.roll(gray, 7, axis=1), np.roll(gray, 7, axis=0)], axis=-1), "RGB")
+    image.save(path, image_format, **({"quality": 92} if image_format == "JPEG" else {}))
+    return width * height / 1_000_000
+
+def time_pipeline(pipeline, path, repeats):
+    pipeline(path)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        pipeline(path)
+        samples.append(time.perf_counter() - start)
+    return percentiles_ms(samples)
+
+def measure_peak_memory(name, path):
+    output = subprocess.run(
+        [sys.executable, "-c", PEAK_MEMORY_SCRIPT, name, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])["extra_peak_mb"]
+
+def measure_batch(paths, repeats):
+    '''Whole-batch time for the fast path writing into one preallocated buffer.'''
+    batch = np.empty((len(paths), *TARGET_SIZE, 3), dtype=np.float32)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i, path in enumerate(paths):
+            fill_scan_array(decode_scan_image(path, TARGET_SIZE), batch[i])
+        samples.append(time.perf_counter() - start)
+    return {"images": len(paths), "p50_ms_per_image": percentiles_ms(samples)["p50_ms"] / len(paths)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scan image decode + preprocessing.")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[1, 4, 12, 24])
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=sorted(FORMATS))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "benchmark": "image_preprocessing",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pillow": Image.__version__,
+        },
+        "target_size": TARGET_SIZE,
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        paths_by_format = {}
+        for format_name in args.formats:
+            mode, image_format, extension = FORMATS[format_name]
+            for megapixels in args.megapixels:
+                path = os.path.join(workdir, f"{format_name}-{megapixels:g}mp{extension}")
+                actual_megapixels = make_image(path, megapixels, mode, image_format)
+                paths_by_format.setdefault(format_name, []).append(path)
+                case = {
+                    "format": format_name,
+                    "megapixels": actual_megapixels,
+                    "file_mb": os.path.getsize(path) / (1024 * 1024),
+                    # Draft-mode JPEG decoding trades exact pixels for speed
+                    "max_abs_diff": float(np.abs(fast_pipeline(path) - legacy_pipeline(path)).max()),
+                }
+                for name, pipeline in PIPELINES.items():
+                    timing = time_pipeline(pipeline, path, args.repeats)
+                    peak_mb = measure_peak_memory(name, path)
+                    case[name] = {
+                        "p50_ms": timing["p50_ms"],
+                        "ms_per_megapixel": timing["p50_ms"] / actual_megapixels,
+                        "peak_mb": peak_mb,
+                        "peak_mb_per_megapixel": peak_mb / actual_megapixels,
+                    }
+                case["speedup"] = case["legacy"]["p50_ms"] / case["fast"]["p50_ms"]
+                report["cases"].append(case)
+                print(
+                    f"{format_name:<9} {actual_megapixels:>5.1f} MP  "
+                    f"legacy {case['legacy']['p50_ms']:>7.1f} ms {case['legacy']['peak_mb']:>6.1f} MB  "
+                    f"fast {case['fast']['p50_ms']:>7.1f} ms {case['fast']['peak_mb']:>6.1f} MB  "
+                    f"x{case['speedup']:.1f}  max diff {case['max_abs_diff']:.0f}"
+                )
+        report["batch"] = {name: measure_batch(paths, args.repeats) for name, paths in paths_by_format.items()}
+    report["peak_rss_mb"] = peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"image_preprocessing-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"report: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+'''
+Load generator for the streaming LLM endpoints: drives N concurrent
+multi-turn conversations through the app's async client
+(utils.chat_client.astream_chat) and reports time to first token, tokens
+per second and error rates. Targets the OpenAI-style chat endpoint
+(MEDAI_LLM_BASE_URL) or Gemini streamGenerateContent (MEDAI_GEMINI_BASE_URL).
+--mock starts benchmarks.mock_llm_server in-process, so it runs fully offline.
+
+    python -m benchmarks.llm_load --mock [--conversations 50] [--turns 3] [--target chat|gemini]
+    python -m benchmarks.llm_load --base-url http://host:8808/v1 --api-key KEY
+'''
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.disease_prediction import percentiles_ms
+from benchmarks.mock_llm_server import MockSettings, start_server
+from utils import chat_client
+from utils.chatbot import DEFAULT_MODEL, LLM_BASE_URL, chat_request, chunk_text
+from utils.gemini import GEMINI_BASE_URL
+
+RESULTS_DIR = "./benchmarks/results"
+GEMINI_DEFAULT_URL = "https://generativelanguage.googleapis.com"
+GEMINI_MODEL = "gemini-1.5-flash"
+PROMPTS = (
+    "I have had a headache and mild fever for two days. What should I do?",
+    "Is it safe to take ibuprofen with an empty stomach?",
+    "My child has a rash on the arms after playing outside.",
+    "What are common causes of persistent dry cough at night?",
+    "How much water should I drink per day when I have a cold?",
+    "I feel dizzy when I stand up quickly. Should I be worried?",
+)
+
+def chat_target(base_url, api_key, model, max_tokens):
+    url = f"{base_url.rstrip('/')}/chat/completions"
+
+    def request(messages):
+        _, headers, payload = chat_request(messages, api_key, model, max_tokens)
+        return url, headers, payload
+
+    def reply(text):
+        return {"role": "assistant", "content": text}
+
+    return request, chunk_text, reply
+
+def gemini_text(chunk):
+    candidates = chunk.get("candidates") or [{}]
+    return "".join(part.get("text", "") for part in (candidates[0].get("content") or {}).get("parts", []))
+
+def gemini_target(base_url, api_key, model, max_tokens):
+    url = f"{base_url.rstrip('/')}/v1beta/models/{model}:streamGenerateContent?alt=sse"
+
+    def request(messages):
+        contents = [
+            {"role": "model" if message["role"] == "assistant" else "user", "parts": [{"text": message["content"]}]}
+            for message in messages
+        ]
+        payload = {"contents": contents, "generationConfig": {"maxOutputTokens": max_tokens}}
+        return url, {"x-goog-api-key": api_key}, payload
+
+    def reply(text):
+        return {"role": "assistant", "content": text}
+
+    return request, gemini_text, reply
+
+async def run_turn(request, text_of, messages):
+    start = time.perf_counter()
+    first_token = None
+    chunks = 0
+    usage_tokens = None
+    parts = []
+    try:
+        async for chunk in chat_client.astream_chat(*request(messages)):
+            text = text_of(chunk)
+            if text:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks += 1
+                parts.append(text)
+            usage_tokens = (chunk.get("usageMetadata") or {}).get("candidatesTokenCount") or usage_tokens
+    except Exception as e:
+        return {"ok": False, "error": type(e).__name__, "seconds": time.perf_counter() - start}, None
+    seconds = time.perf_counter() - start
+    # Gemini chunks carry several tokens and report the total; chat chunks are one token each
+    tokens = usage_tokens or chunks
+    generating = seconds - (first_token - start) if first_token else 0
+    return {
+        "ok": first_token is not None,
+        "error": None if first_token is not None else "EmptyResponse",
+        "seconds": seconds,
+        "ttft_seconds": first_token - start if first_token else None,
+        "tokens": tokens,
+        "tokens_per_second": tokens / generating if generating > 0 else None,
+    }, "".join(parts)
+
+async def run_conversation(index, target, turns, ramp_seconds, conversations, records):
+    request, text_of, reply = target
+    if ramp_seconds:
+        await asyncio.sleep(ramp_seconds * index / conversations)
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": PROMPTS[(index + turn) % len(PROMPTS)]})
+        record, text = await run_turn(request, text_of, messages)
+        records.append({"conversation": index, "turn": turn, **record})
+        if text:
+            messages.append(reply(text))
+        else:
+            messages.pop()
+
+async def run_load(target, conversations, turns, ramp_seconds):
+    records = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            run_conversation(index, target, turns, ramp_seconds, conversations, records)
+            for index in range(conversations)
+        ))
+    finally:
+        await chat_client.get_async_client().aclose()
+        chat_client._async_client = None
+    return records, time.perf_counter() - start
+
+def summarize(records, wall_seconds):
+    ok = [record for record in records if record["ok"]]
+    ttft = [record["ttft_seconds"] for record in ok]
+    rates = [record["tokens_per_second"] for record in ok if record["tokens_per_second"]]
+    tokens = sum(record["tokens"] for record in ok)
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "errors": len(records) - len(ok),
+        "error_rate": (len(records) - len(ok)) / len(records) if records else 0.0,
+        "errors_by_type": dict(Counter(record["error"] for record in records if not record["ok"])),
+        "time_to_first_token": percentiles_ms(ttft) if ttft else None,
+        "request_seconds": percentiles_ms([record["seconds"] for record in ok]) if ok else None,
+        # Per-stream generation rate after the first token; p10 is the slow tail
+        "stream_tokens_per_second": {
+            "p10": sorted(rates)[int(0.1 * len(rates))] if rates else None,
+            "p50": sorted(rates)[len(rates) // 2] if rates else None,
+        },
+        "total_tokens": tokens,
+        "aggregate_tokens_per_second": tokens / wall_seconds if wall_seconds else None,
+        "wall_seconds": wall_seconds,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive concurrent streaming conversations and report TTFT, tokens/s and errors.")
+    parser.add_argument("--target", choices=["chat", "gemini"], default="chat")
+    parser.add_argument("--base-url", help="endpoint base (default: MEDAI_LLM_BASE_URL / MEDAI_GEMINI_BASE_URL)")
+    parser.add_argument("--api-key", default=os.environ.get("MEDAI_LOAD_API_KEY", "mock"))
+    parser.add_argument("--model", help=f"model name (default: {DEFAULT_MODEL} / {GEMINI_MODEL})")
+    parser.add_argument("--conversations", type=int, default=20, help="concurrent conversations")
+    parser.add_argument("--turns", type=int, default=3, help="turns per conversation")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="spread conversation starts over this long")
+    parser.add_argument("--pool-size", type=int, default=chat_client.CHAT_POOL_SIZE, help="HTTP connection pool size")
+    parser.add_argument("--retries", type=int, default=chat_client.CHAT_RETRIES)
+    parser.add_argument("--mock", action="store_true", help="start the mock server in-process and target it")
+    parser.add_argument("--latency-ms", type=float, default=300, help="mock: delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="mock: generation rate per stream")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock: fraction of failing requests")
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.mock:
+        server = start_server(settings=MockSettings(
+            latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second,
+            tokens=args.max_tokens, error_rate=args.error_rate,
+        ))
+        mock_base = f"http://127.0.0.1:{server.server_port}"
+        base_url = f"{mock_base}/v1" if args.target == "chat" else mock_base
+    elif args.target == "chat":
+        base_url = args.base_url or LLM_BASE_URL
+    else:
+        base_url = args.base_url or GEMINI_BASE_URL or GEMINI_DEFAULT_URL
+    model = args.model or (DEFAULT_MODEL if args.target == "chat" else GEMINI_MODEL)
+    make_target = chat_target if args.target == "chat" else gemini_target
+    target = make_target(base_url, args.api_key, model, args.max_tokens)
+
+    chat_client.CHAT_POOL_SIZE = args.pool_size
+    chat_client.CHAT_RETRIES = args.retries
+    records, wall_seconds = asyncio.run(run_load(target, args.conversations, args.turns, args.ramp_seconds))
+    summary = summarize(records, wall_seconds)
+    report = {
+        "benchmark": "llm_load",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "workload": {
+            "target": args.target,
+            "base_url": base_url,
+            "model": model,
+            "conversations": args.conversations,
+            "turns": args.turns,
+            "max_tokens": args.max_tokens,
+            "ramp_seconds": args.ramp_seconds,
+            "pool_size": args.pool_size,
+            "retries": args.retries,
+            "mock": {
+                "latency_ms": args.latency_ms,
+                "tokens_per_second": args.tokens_per_second,
+                "error_rate": args.error_rate,
+                "server": dict(server.RequestHandlerClass.settings.stats),
+            } if server else None,
+        },
+        "summary": summary,
+        "requests": records,
+    }
+    if server:
+        server.shutdown()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"llm_load-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    ttft = summary["time_to_first_token"]
+    print(f"{summary['requests']} requests over {args.conversations} conversations in {wall_seconds:.1f} s, "
+          f"errors {summary['errors']} ({summary['error_rate']:.1%})")
+    if ttft:
+        print(f"time to first token: p50 {ttft['p50_ms']:.0f} ms  p90 {ttft['p90_ms']:.0f} ms  p99 {ttft['p99_ms']:.0f} ms")
+    rates = summary["stream_tokens_per_second"]
+    if rates["p50"]:
+        print(f"tokens/s per stream: p50 {rates['p50']:.1f}  p10 {rates['p10']:.1f}; "
+              f"aggregate {summary['aggregate_tokens_per_second']:.0f} tokens/s")
+    for error, count in summary["errors_by_type"].items():
+        print(f"  {count:>5}  {error}")
+    print(f"report: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+'''
+Local stand-in for the remote LLM endpoints, for load tests and offline
+development. Speaks enough of both APIs for the app and the load generator:
+
+  POST /v1/chat/completions                        OpenAI-style, SSE chunks when "stream" is set
+  POST /v1beta/models/<model>:generateContent      Gemini JSON response
+  POST /v1beta/models/<model>:streamGenerateContent?alt=sse
+  POST /upload/v1beta/files                        Gemini resumable upload (start, then upload+finalize)
+  GET  /stats                                      request, error and open-stream counts
+
+Answers are filler words generated from the prompt, so the same prompt gets
+the same answer. Each response waits --latency-ms before the first token and
+then emits --tokens-per-second; --error-rate of requests fail with --error-status.
+
+    python -m benchmarks.mock_llm_server [--port 8808] [--latency-ms 300] [--tokens-per-second 40]
+    MEDAI_LLM_BASE_URL=http://127.0.0.1:8808/v1 MEDAI_GEMINI_BASE_URL=http://127.0.0.1:8808 streamlit run app.py
+'''
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = (
+    "rest fluids symptoms may indicate a mild viral infection monitor temperature consult doctor "
+    "if pain persists avoid strenuous activity take medication as prescribed follow up after days "
+    "blood pressure diet sleep hydration recommended tests include complete blood count"
+).split()
+REPORT_SPECIALIZATIONS = ["General Physician", "Internal Medicine"]
+
+class MockSettings:
+    def __init__(self, latency_ms=300, tokens_per_second=40, tokens=200, error_rate=0.0, error_status=503, seed=0):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.stats = {"requests": 0, "errors": 0, "streams_open": 0, "streams_max": 0, "tokens": 0}
+
+    def count(self, key, delta=1):
+        with self.lock:
+            self.stats[key] += delta
+            if key == "streams_open":
+                self.stats["streams_max"] = max(self.stats["streams_max"], self.stats["streams_open"])
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+def answer_tokens(prompt, count):
+    '''Deterministic filler for a prompt, one word (with its trailing space) per token.'''
+    rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+    return [rng.choice(WORDS) + " " for _ in range(count)]
+
+def gemini_prompt(body):
+    return "\n".join(
+        part["text"] for content in body.get("contents", []) for part in content.get("parts", []) if "text" in part
+    )
+
+def gemini_answer(prompt, count):
+    tokens = answer_tokens(prompt, count)
+    if "JSON" in prompt:
+        # The report analysis prompt asks for a JSON object
+        explanation = "".join(tokens).strip()
+        text = json.dumps({"specializations": REPORT_SPECIALIZATIONS, "explanation": explanation})
+        return [text[i:i + 16] for i in range(0, len(text), 16)]
+    return tokens
+
+def gemini_chunk(text, model, finished=False, token_count=None):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    chunk = {"candidates": [candidate], "modelVersion": model}
+    if finished:
+        candidate["finishReason"] = "STOP"
+        chunk["usageMetadata"] = {"candidatesTokenCount": token_count, "totalTokenCount": token_count}
+    return chunk
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = MockSettings()
+    uploads = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_response(self):
+        self.settings.count("errors")
+        self.send_json(self.settings.error_status, {"error": {"code": self.settings.error_status, "message": "mock failure"}})
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def write_event(self, payload):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self.write_chunk(f"data: {data}\n\n".encode())
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def paced(self, tokens):
+        '''Yield tokens after the first-token latency, at the configured rate.'''
+        settings = self.settings
+        time.sleep(settings.latency_ms / 1000)
+        interval = 1 / settings.tokens_per_second if settings.tokens_per_second else 0
+        start = time.perf_counter()
+        for i, token in enumerate(tokens):
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.settings.count("tokens")
+            yield token
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            with self.settings.lock:
+                self.send_json(200, dict(self.settings.stats))
+        else:
+            self.send_json(404, {"error": {"code": 404, "message": f"unknown path {self.path}"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        raw = self.read_body()
+        self.settings.count("requests")
+        if url.path.startswith("/upload/"):
+            return self.handle_upload(url, raw)
+        if self.settings.should_fail():
+            return self.send_error_response()
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            return self.send_json(400, {"error": {"code": 400, "message": "invalid JSON"}})
+        if url.path.endswith("/chat/completions"):
+            return self.handle_chat(body)
+        if ":generateContent" in url.path or ":streamGenerateContent" in url.path:
+            model = url.path.rsplit("/", 1)[-1].split(":")[0]
+            return self.handle_gemini(body, model, stream=":streamGenerateContent" in url.path)
+        self.send_json(404, {"error": {"code": 404, "message": f"unknown path {url.path}"}})
+
+    def handle_chat(self, body):
+        model = body.get("model", "mock")
+        prompt = json.dumps(body.get("messages", []))
+        count = min(self.settings.tokens, int(body.get("max_tokens") or self.settings.tokens))
+        tokens = answer_tokens(prompt, count)
+        request_id = f"chatcmpl-mock-{next(self.settings.counter)}"
+        created = int(time.time())
+        if not body.get("stream"):
+            text = "".join(self.paced(tokens))
+            return self.send_json(200, {
+                "id": request_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": len(tokens)},
+            })
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": request_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        self.start_stream()
+        self.settings.count("streams_open")
+        try:
+            for i, token in enumerate(self.paced(tokens)):
+                self.write_event(chunk({"role": "assistant", "content": token} if i == 0 else {"content": token}))
+            self.write_event(chunk({}, "stop"))
+            self.write_event("[DONE]")
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            self.settings.count("streams_open", -1)
+
+    def handle_gemini(self, body, model, stream):
+        prompt = gemini_prompt(body)
+        count = int(body.get("generationConfig", {}).get("maxOutputTokens") or self.settings.tokens)
+        pieces = gemini_answer(prompt, min(count, self.settings.tokens))
+        if not stream:
+            text = "".join(self.paced(pieces))
+            return self.send_json(200, gemini_chunk(text, model, finished=True, token_count=len(pieces)))
+        self.start_stream()
+        self.settings.count("streams_open")
+        try:
+            for i, piece in enumerate(self.paced(pieces)):
+                last = i == len(pieces) - 1
+                self.write_event(gemini_chunk(piece, model, finished=last, token_count=len(pieces) if last else None))
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            self.settings.count("streams_open", -1)
+
+    def handle_upload(self, url, raw):
+        command = self.headers.get("X-Goog-Upload-Command", "")
+        if command == "start":
+            upload_id = str(next(self.settings.counter))
+            metadata = json.loads(raw or b"{}").get("file") or {}
+            self.uploads[upload_id] = {
+                "mimeType": self.headers.get("X-Goog-Upload-Header-Content-Type", metadata.get("mimeType", "")),
+                "size": 0,
+            }
+            host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+            return self.send_json(200, {}, {
+                "X-Goog-Upload-URL": f"http://{host}/upload/v1beta/files?upload_id={upload_id}",
+                "X-Goog-Upload-Status": "active",
+            })
+        upload_id = parse_qs(url.query).get("upload_id", [""])[0]
+        upload = self.uploads.get(upload_id)
+        if upload is None:
+            return self.send_json(404, {"error": {"code": 404, "message": "unknown upload"}})
+        upload["size"] += len(raw)
+        if "finalize" not in command:
+            return self.send_json(200, {}, {"X-Goog-Upload-Status": "active"})
+        del self.uploads[upload_id]
+        name = f"files/mock-{upload_id}"
+        host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+        return self.send_json(200, {"file": {
+            "name": name,
+            "uri": f"http://{host}/v1beta/{name}",
+            "mimeType": upload["mimeType"],
+            "sizeBytes": str(upload["size"]),
+            "state": "ACTIVE",
+        }}, {"X-Goog-Upload-Status": "final"})
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 resets connections when many clients connect at once
+    request_queue_size = 1024
+
+def start_server(host="127.0.0.1", port=0, settings=None):
+    '''Serve in a daemon thread; returns the server (its base URL is http://host:server.server_port).'''
+    handler = type("Handler", (MockLLMHandler,), {"settings": settings or MockSettings(), "uploads": {}})
+    server = MockLLMServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve stand-in OpenAI-style and Gemini endpoints locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency-ms", type=float, default=300, help="delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="0 sends all tokens at once")
+    parser.add_argument("--tokens", type=int, default=200, help="answer length (capped by the request's max tokens)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    settings = MockSettings(args.latency_ms, args.tokens_per_second, args.tokens, args.error_rate, args.error_status, args.seed)
+    server = start_server(args.host, args.port, settings)
+    base = f"http://{args.host}:{server.server_port}"
+    print(f"mock LLM server on {base}")
+    print(f"  MEDAI_LLM_BASE_URL={base}/v1")
+    print(f"  MEDAI_GEMINI_BASE_URL={base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+'''
+Check and benchmark for the scan worker pool (MEDAI_SCAN_WORKERS), using a
+synthetic NumPy classifier so it runs without the trained models. Several
+client threads submit preallocated float32 batches, as the scan page does,
+through functions.scans.predict_with_workers; every output must match
+in-process inference on the same batch. Then requests are queued and the pool
+is closed at once: each must still be answered, with outputs or an error.
+Reports micro-batch sizes and request latency, and exits 1 when a check fails.
+
+    python -m benchmarks.scan_workers [--workers 2] [--clients 8] [--images 1 3 8] [--output FILE]
+'''
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+from utils import model_registry
+from utils.scan_worker import ScanInferencePool
+
+RESULTS_DIR = "./benchmarks/results"
+IMAGE_SHAPE = (224, 224, 3)
+CLASS_NAMES = ["class_a", "class_b", "class_c", "class_d"]
+MODEL_NAMES = ("brain_tumor", "cataract")
+
+class SyntheticClassifier:
+    '''Per-image softmax over a fixed projection of the channel means, with a small per-image cost.'''
+
+    def __init__(self, seed=0, seconds_per_image=0.002):
+        self.weights = np.random.default_rng(seed).normal(size=(3, len(CLASS_NAMES)))
+        self.seconds_per_image = seconds_per_image
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        time.sleep(self.seconds_per_image * len(batch))
+        logits = batch.mean(axis=(1, 2)) / 255 @ self.weights
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+def register_synthetic_models():
+    '''Worker initializer: serve both scan model names with the synthetic classifier.'''
+    for seed, name in enumerate(MODEL_NAMES):
+        model_registry.register_model(name, lambda seed=seed: (SyntheticClassifier(seed), CLASS_NAMES))
+
+def make_batch(n, seed):
+    '''A preallocated batch like functions.scans.load_scan_images returns.'''
+    batch = np.empty((n, *IMAGE_SHAPE), dtype=np.float32)
+    batch[...] = np.random.default_rng(seed).integers(0, 256, size=(n, 1, 1, 3))
+    return batch
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the scan worker pool with ndarray batches and report batching.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent submitting threads")
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--images", type=int, nargs="+", default=[1, 3, 8], help="images per request (cycled)")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=20)
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    from functions.scans import predict_in_batches, predict_with_workers
+
+    register_synthetic_models()
+    pool = ScanInferencePool(
+        workers=args.workers, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms,
+        initializer="benchmarks.scan_workers:register_synthetic_models",
+    )
+    failures = []
+    lock = threading.Lock()
+
+    def client(index):
+        for request in range(args.requests):
+            model_name = MODEL_NAMES[(index + request) % len(MODEL_NAMES)]
+            batch = make_batch(args.images[(index + request) % len(args.images)], seed=index * 1000 + request)
+            try:
+                outputs, _ = predict_with_workers(pool, model_name, batch)
+                expected, _ = predict_in_batches(model_registry.get_model(model_name)[0], batch)
+                if outputs.shape != expected.shape or not np.allclose(outputs, expected, atol=1e-5):
+                    raise AssertionError(f"outputs differ from in-process inference for {len(batch)} image(s)")
+            except Exception as e:
+                with lock:
+                    failures.append(f"client {index} request {request} ({model_name}): {type(e).__name__}: {e}")
+
+    try:
+        # Workers load their models on the first batch; keep that out of the timing
+        predict_with_workers(pool, MODEL_NAMES[0], make_batch(1, seed=10 ** 9))
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(index,)) for index in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        metrics = pool.metrics()
+
+        # Shutdown with work still queued must not leave requests waiting
+        request_ids = [pool.submit(MODEL_NAMES[i % len(MODEL_NAMES)], make_batch(3, seed=i)) for i in range(args.clients)]
+        pool.close()
+        for request_id in request_ids:
+            result = pool.wait(request_id, timeout=5)
+            if result is None:
+                failures.append(f"request {request_id} was not answered after close()")
+            elif any(output is None and not error for output, error in zip(result["outputs"], result["errors"])):
+                failures.append(f"request {request_id} has images with neither an output nor an error after close()")
+    finally:
+        pool.close()
+
+    report = {
+        "benchmark": "scan_workers",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "workload": vars(args),
+        "seconds": seconds,
+        "metrics": metrics,
+        "failures": failures,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"scan_workers-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{metrics['completed_items']} images from {args.clients} clients in {seconds:.2f} s, "
+          f"mean batch {metrics['mean_batch_size'] or 0:.1f}, p50 request {metrics['p50_request_ms'] or 0:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"report: {output}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+'''
+Import-time profile of the Streamlit entry point, captured with
+`python -X importtime` in a fresh interpreter, plus the first-visit import
+cost of every page. Fails (exit code 1) when importing app.py takes longer
+than the startup budget or pulls in a module that should only load with
+its page.
+
+    python -m benchmarks.startup [--budget-ms 1500] [--pages] [--output FILE]
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+RESULTS_DIR = "./benchmarks/results"
+STARTUP_BUDGET_MS = float(os.environ.get("MEDAI_STARTUP_BUDGET_MS", "1500"))
+# Modules the login page must not need; each belongs to a lazily loaded page
+DEFERRED_MODULES = (
+    "tensorflow",
+    "keras",
+    "vosk",
+    "google.genai",
+    "sklearn",
+    "scipy",
+    "pandas",
+    "joblib",
+    "audio_recorder_streamlit",
+    "httpx",
+)
+
+# Times each import and lists the modules it added; the -X importtime
+# breakdown goes to stderr
+IMPORT_SCRIPT = '''
+import importlib, json, sys, time
+imports = []
+for name in sys.argv[1:]:
+    before = set(sys.modules)
+    start = time.perf_counter()
+    importlib.import_module(name)
+    imports.append({
+        "module": name,
+        "ms": (time.perf_counter() - start) * 1000,
+        "new_modules": sorted(set(sys.modules) - before),
+    })
+hwm_kb = None
+try:
+    with open("/proc/self/status") as f:
+        hwm_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except (OSError, StopIteration):
+    pass
+print(json.dumps({"imports": imports, "peak_rss_mb": hwm_kb / 1024 if hwm_kb else None}))
+'''
+
+def parse_importtime(stderr):
+    '''(module, self_us, cumulative_us) rows from -X importtime output.'''
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        rows.append((name.strip(), int(head.partition(":")[2]), int(cumulative_us)))
+    return rows
+
+def profile_import(module, preload=()):
+    '''
+    Import preload, then module, in a fresh interpreter. Returns the time and
+    new modules of the last import with its share of the importtime breakdown.
+    '''
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT, *preload, module],
+        capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"},
+    )
+    if result.returncode != 0:
+        return {"ok": False, "error": result.stderr.strip().splitlines()[-1], "ms": None, "new_modules": [], "rows": []}
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    target = measured["imports"][-1]
+    new_modules = set(target["new_modules"])
+    return {
+        "ok": True,
+        "error": None,
+        "ms": target["ms"],
+        "new_modules": target["new_modules"],
+        "rows": [row for row in parse_importtime(result.stderr) if row[0] in new_modules],
+        "peak_rss_mb": measured["peak_rss_mb"],
+    }
+
+def summarize(profile, top):
+    rows = profile["rows"]
+    return {
+        "ok": profile["ok"],
+        "error": profile["error"],
+        "total_ms": profile["ms"],
+        "modules": len(profile["new_modules"]),
+        "peak_rss_mb": profile.get("peak_rss_mb"),
+        "slowest_self": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[1])[:top]
+        ],
+        "slowest_cumulative": [
+            {"module": name, "cumulative_ms": cumulative_us / 1000}
+            for name, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[:top]
+        ],
+    }
+
+def deferred_modules_loaded(modules):
+    return sorted(name for name in modules if any(name == d or name.startswith(d + ".") for d in DEFERRED_MODULES))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile app.py imports and check the startup budget.")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="maximum import time of app.py")
+    parser.add_argument("--pages", action="store_true", help="also profile the first-visit import of every page")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    startup = profile_import("app")
+    report = {
+        "benchmark": "startup",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "budget_ms": args.budget_ms,
+        "startup": summarize(startup, args.top),
+        "deferred_modules_loaded": deferred_modules_loaded(startup["new_modules"]),
+    }
+    if args.pages:
+        from app import PAGE_MODULES
+
+        report["pages"] = {
+            page: summarize(profile_import(module, preload=["app"]), args.top)
+            for page, module in PAGE_MODULES.items()
+        }
+
+    failures = []
+    if not startup["ok"]:
+        failures.append(f"importing app failed: {startup['error']}")
+    elif report["startup"]["total_ms"] > args.budget_ms:
+        failures.append(f"importing app took {report['startup']['total_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if report["deferred_modules_loaded"]:
+        failures.append(f"loaded at startup: {', '.join(report['deferred_modules_loaded'])}")
+    report["failures"] = failures
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"app import:  {report['startup']['total_ms'] or 0:.0f} ms over {report['startup']['modules']} modules "
+          f"(budget {args.budget_ms:.0f} ms)")
+    if report["startup"]["peak_rss_mb"]:
+        print(f"peak RSS:    {report['startup']['peak_rss_mb']:.0f} MB")
+    for row in report["startup"]["slowest_cumulative"]:
+        print(f"  {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+    for page, summary in report.get("pages", {}).items():
+        status = f"{summary['total_ms']:>8.1f} ms" if summary["ok"] else f"failed: {summary['error']}"
+        print(f"page {page:<24} {status}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"report: {output}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
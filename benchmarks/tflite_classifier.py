@@ -0,0 +1,121 @@
+'''
+Check for the quantized input and output math of
+utils.scan_models.TFLiteClassifier, using a fake interpreter so it runs
+without TensorFlow or tflite_runtime. Covers int8 and uint8 inputs (including
+values outside the calibrated range, which must saturate rather than wrap),
+dequantized outputs, float32 models and batch resizing. Exits 1 when a check fails.
+
+    python -m benchmarks.tflite_classifier
+'''
+import sys
+import types
+import numpy as np
+
+IMAGE_SHAPE = (4, 4, 3)
+NUM_CLASSES = 3
+
+class FakeInterpreter:
+    '''The slice of the TFLite Interpreter API that TFLiteClassifier calls.'''
+    input_dtype = np.float32
+    input_quantization = (0.0, 0)
+    output_dtype = np.float32
+    output_quantization = (0.0, 0)
+
+    def __init__(self, model_path, num_threads=None):
+        self.shape = [1, *IMAGE_SHAPE]
+        self.received = None
+        self.resizes = 0
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array(self.shape), "dtype": self.input_dtype,
+                 "quantization": self.input_quantization}]
+
+    def get_output_details(self):
+        return [{"index": 1, "shape": np.array([self.shape[0], NUM_CLASSES]), "dtype": self.output_dtype,
+                 "quantization": self.output_quantization}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = list(shape)
+        self.resizes += 1
+
+    def set_tensor(self, index, value):
+        assert list(value.shape) == self.shape, f"tensor shape {value.shape} != allocated {self.shape}"
+        self.received = value
+
+    def invoke(self):
+        pass
+
+    def get_tensor(self, index):
+        # Raw output values 0, 1, 2, ... in the output dtype
+        return np.arange(self.shape[0] * NUM_CLASSES).reshape(self.shape[0], NUM_CLASSES).astype(self.output_dtype)
+
+def make_classifier(**spec):
+    '''A TFLiteClassifier whose interpreter is a FakeInterpreter configured by spec.'''
+    interpreter = type("Interpreter", (FakeInterpreter,), spec)
+    package = types.ModuleType("tflite_runtime")
+    module = types.ModuleType("tflite_runtime.interpreter")
+    module.Interpreter = interpreter
+    package.interpreter = module
+    sys.modules["tflite_runtime"] = package
+    sys.modules["tflite_runtime.interpreter"] = module
+    from utils.scan_models import TFLiteClassifier
+
+    return TFLiteClassifier("fake.tflite")
+
+def expect(failures, name, condition, detail=""):
+    print(f"{'ok  ' if condition else 'FAIL'} {name}{f': {detail}' if detail and not condition else ''}")
+    if not condition:
+        failures.append(name)
+
+def main(argv=None):
+    failures = []
+    # Pixel values around and beyond the calibrated range of the quantized inputs
+    pixels = np.array([-50.0, 0.0, 100.0, 127.4, 200.0, 255.0, 400.0], dtype=np.float32)
+    batch = np.resize(pixels, (2, *IMAGE_SHAPE)).astype(np.float32)
+
+    for dtype, scale, zero_point in ((np.int8, 1.0, -128), (np.int8, 2.0, 0), (np.uint8, 1.0, 0), (np.uint8, 0.5, 10)):
+        model = make_classifier(input_dtype=dtype, input_quantization=(scale, zero_point))
+        model.predict_on_batch(batch)
+        received = model.interpreter.received
+        limits = np.iinfo(dtype)
+        # Reference: quantize in float64 and saturate, then cast
+        expected = np.clip(np.round(batch.astype(np.float64) / scale + zero_point), limits.min, limits.max).astype(dtype)
+        name = f"{np.dtype(dtype).name} input, scale {scale}, zero point {zero_point}"
+        expect(failures, f"{name}: dtype", received.dtype == dtype, str(received.dtype))
+        expect(failures, f"{name}: values saturate", np.array_equal(received, expected),
+               f"got {received.ravel()[:7]}, expected {expected.ravel()[:7]}")
+        # Larger pixels never quantize to smaller values (a wrap-around would)
+        order = np.argsort(batch.ravel(), kind="stable")
+        expect(failures, f"{name}: monotonic", np.all(np.diff(received.ravel()[order].astype(np.int64)) >= 0))
+
+    for dtype, scale, zero_point in ((np.int8, 1 / 256, -128), (np.uint8, 1 / 255, 0)):
+        model = make_classifier(
+            input_dtype=dtype, input_quantization=(1.0, 0),
+            output_dtype=dtype, output_quantization=(scale, zero_point),
+        )
+        output = model.predict_on_batch(batch)
+        raw = np.arange(2 * NUM_CLASSES).reshape(2, NUM_CLASSES).astype(dtype)
+        expected = (raw.astype(np.float32) - zero_point) * scale
+        name = f"{np.dtype(dtype).name} output dequantized"
+        expect(failures, name, output.dtype == np.float32 and np.allclose(output, expected), f"got {output}")
+
+    model = make_classifier()
+    model.predict_on_batch(batch)
+    expect(failures, "float32 input passed through", model.interpreter.received.dtype == np.float32
+           and np.array_equal(model.interpreter.received, batch))
+
+    model = make_classifier(input_dtype=np.int8, input_quantization=(1.0, -128))
+    for size in (1, 4, 4, 2):
+        output = model.predict_on_batch(np.zeros((size, *IMAGE_SHAPE), dtype=np.float32))
+        expect(failures, f"batch of {size}: output rows", len(output) == size, str(output.shape))
+    expect(failures, "resized only when the batch length changes", model.interpreter.resizes == 2,
+           f"{model.interpreter.resizes} resizes")
+
+    print(f"{len(failures)} failure(s)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+'''
+Benchmark for long-recording transcription: wall-clock time of
+utils.speech.transcribe_long against the number of worker processes, on a
+synthetic consultation-length WAV (speech-like noise bursts separated by
+pauses). Needs the Vosk model; runs offline and writes a JSON report.
+
+    python -m benchmarks.transcription [--minutes 10] [--workers 1 2 4] [--output FILE]
+'''
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import wave
+from datetime import datetime, timezone
+import numpy as np
+
+from utils import speech
+
+RESULTS_DIR = "./benchmarks/results"
+
+def synthetic_recording(minutes, sample_rate=speech.MODEL_SAMPLE_RATE, seed=0):
+    '''Bursts of band-limited noise with a 4 Hz syllable envelope, 1-6 s long, between 0.6-2 s pauses.'''
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * sample_rate)
+    audio = rng.normal(0, 40, size=total).astype(np.float32)  # room noise
+    position = 0
+    while position < total:
+        position += int(rng.uniform(0.6, 2.0) * sample_rate)
+        length = min(int(rng.uniform(1.0, 6.0) * sample_rate), total - position)
+        if length <= 0:
+            break
+        t = np.arange(length) / sample_rate
+        burst = np.convolve(rng.normal(0, 1, size=length), np.ones(8) / 8, mode="same")
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi))
+        audio[position:position + length] += (burst * envelope * 6000).astype(np.float32)
+        position += length
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(np.clip(audio, -32768, 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+def warm_up(workers):
+    '''Start the pool and load the model in every worker, so timings exclude model loading.'''
+    start = time.perf_counter()
+    if workers <= 1:
+        speech.get_recognizer_pool()
+    else:
+        executor = speech.get_transcription_executor(workers)
+        silence = np.zeros(speech.MODEL_SAMPLE_RATE // 10, dtype=np.int16).tobytes()
+        for future in [executor.submit(speech._transcribe_segment, i, silence) for i in range(workers * 2)]:
+            future.result()
+    return time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark long-recording transcription against worker count.")
+    parser.add_argument("--minutes", type=float, default=10.0, help="length of the synthetic recording")
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)} | {cores})
+    audio_bytes = synthetic_recording(args.minutes, seed=args.seed)
+    report = {
+        "benchmark": "transcription",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": cores,
+        },
+        "workload": {"minutes": args.minutes, "seed": args.seed, "wav_mb": len(audio_bytes) / (1024 * 1024)},
+        "runs": [],
+    }
+    baseline = None
+    texts = set()
+    for workers in worker_counts:
+        startup_seconds = warm_up(workers)
+        timings = []
+        for _ in range(args.repeats):
+            result = speech.transcribe_long(audio_bytes, workers=workers)
+            timings.append(result["info"]["seconds"])
+            texts.add(result["text"])
+        best = min(timings)
+        baseline = baseline or best
+        run = {
+            "workers": workers,
+            "startup_seconds": startup_seconds,
+            "seconds": best,
+            "speedup": baseline / best,
+            "efficiency": baseline / best / workers,
+            "real_time_factor": best / result["info"]["audio_seconds"],
+            "segments": result["info"]["segments"],
+            "speech_seconds": result["info"]["speech_seconds"],
+            "vad_seconds": result["info"]["vad_seconds"],
+        }
+        report["runs"].append(run)
+        print(
+            f"workers {workers:>2}: {best:>7.2f} s  x{run['speedup']:.2f}  "
+            f"RTF {run['real_time_factor']:.3f}  ({run['segments']} segments, startup {startup_seconds:.1f} s)"
+        )
+    # Each segment is decoded independently, so the worker count must not change the text
+    report["consistent_text"] = len(texts) == 1
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"transcription-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"consistent text across worker counts: {report['consistent_text']}")
+    print(f"report: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
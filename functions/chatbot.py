@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.chatbot import stream_chatbot_response
+from utils.chatbot import complete_chat, stream_chatbot_response
+from utils.chat_context import CHAT_SUMMARY_TOKENS, ChatContext
 from utils.user_history import add_history_entry
 
 def show():
@@ -12,6 +13,8 @@ def show():
     
     if 'chat_history' not in st.session_state:
         st.session_state['chat_history'] = []
+    if 'chat_context' not in st.session_state:
+        st.session_state['chat_context'] = ChatContext()
     
     user = st.session_state.user
     user_id = user.get("id")
@@ -21,13 +24,26 @@ def show():
         st.session_state['chat_history'].append({"role": "user", "content": user_input})
         placeholder = st.empty()
         if api_key:
-            response = stream_chatbot_response(st.session_state['chat_history'], api_key, placeholder)
-            st.session_state['chat_history'].append({"role": "assistant", "content": response})
-            # Save to user history
-            add_history_entry(user_id, "chatbot", {
-                "message": user_input,
-                "response": response
-            })
+            # Recent turns verbatim, older ones as a rolling summary, so the request size stays bounded
+            context = st.session_state['chat_context']
+            messages = context.build(
+                st.session_state['chat_history'],
+                summarize=lambda prompt: complete_chat(prompt, api_key, max_tokens=CHAT_SUMMARY_TOKENS)
+            )
+            response = stream_chatbot_response(messages, api_key, placeholder)
+            if response:
+                st.session_state['chat_history'].append({"role": "assistant", "content": response})
+                # Save to user history
+                add_history_entry(user_id, "chatbot", {
+                    "message": user_input,
+                    "response": response
+                })
+            else:
+                # Drop the unanswered message so the next turn does not send it twice
+                st.session_state['chat_history'].pop()
+            stats = context.stats()
+            if stats["summarized_messages"]:
+                st.caption(f"Sent {stats['tokens']} context tokens; {stats['summarized_messages']} earlier messages are summarized.")
         else:
             st.info("Please provide your HuggingFace API Key above.")
     
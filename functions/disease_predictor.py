@@ -1,9 +1,13 @@
 import streamlit as st
-import pandas as pd
-from utils.disease_prediction import predict_disease
-from utils.chatbot import stream_chatbot_response
+from utils.disease_prediction import predict_disease, get_model
+from utils.symptom_vocabulary import load_vocabulary
+from utils.symptom_cooccurrence import related_symptoms
+from utils.chatbot import stream_chatbot_responses
 from utils.user_history import add_history_entry
 
+def add_symptom(symptom):
+    st.session_state.selected_symptoms = [*st.session_state.get("selected_symptoms", []), symptom]
+
 def show():
     st.title("Disease Predictor")
     st.markdown("Enter your symptoms to get a preliminary disease prediction using our AI model.")
@@ -12,20 +16,34 @@ def show():
         st.error("This feature is available only to patients.")
         return
     
-    symptoms_df = pd.read_csv("models/csv/Training.csv")
-    symptom_columns = [col for col in symptoms_df.columns if col != 'prognosis']
+    vocabulary = load_vocabulary()
+    symptom_labels = vocabulary["labels"]
     
     st.subheader("Select Your Symptoms")
     selected_symptom_names = st.multiselect(
         "Select your symptoms",
-        options=symptom_columns,
-        help="Start typing to search for symptoms"
+        options=vocabulary["columns"],
+        format_func=lambda symptom: symptom_labels.get(symptom, symptom),
+        help="Start typing to search for symptoms",
+        key="selected_symptoms"
     )
     
+    suggestions = related_symptoms(selected_symptom_names)
+    if suggestions:
+        st.caption("Often reported together with your selection:" if selected_symptom_names else "Commonly reported symptoms:")
+        suggestion_cols = st.columns(len(suggestions))
+        for col, (symptom, _) in zip(suggestion_cols, suggestions):
+            col.button(
+                f"+ {symptom_labels.get(symptom, symptom)}",
+                key=f"suggest_{symptom}",
+                on_click=add_symptom,
+                args=(symptom,)
+            )
+    
     st.subheader("Select Inference Type")
     inference_type = st.selectbox(
         "Choose inference method:",
-        ["Allopathic (AI)", "Ayurveda (LLM)", "Homeopathic (LLM)"]
+        ["Allopathic (AI)", "Ayurveda (LLM)", "Homeopathic (LLM)", "Ayurveda + Homeopathic (LLM)"]
     )
     
     api_key = st.secrets.get("HF_API_KEY", "")
@@ -38,6 +56,10 @@ def show():
         else:
             user_id = st.session_state.user.get("id")
             if inference_type == "Allopathic (AI)":
+                model = get_model()
+                if not model.available:
+                    st.error(f"The disease prediction model is currently unavailable. {model.error}")
+                    return
                 top_diseases = predict_disease(selected_symptom_names)
                 st.subheader("Prediction Results (Allopathic)")
                 for disease, prob in top_diseases:
@@ -51,18 +73,31 @@ def show():
                 })
             else:
                 st.subheader(f"Prediction Results ({inference_type})")
-                prompt = f"Given these symptoms: {', '.join(selected_symptom_names)}, provide a {inference_type.lower()} diagnosis and possible remedies."
-                messages = [
-                    {"role": "user", "content": prompt}
-                ]
-                placeholder = st.empty()
+                # "Ayurveda + Homeopathic (LLM)" streams both answers side by side
+                systems = [name.strip() for name in inference_type.replace(" (LLM)", "").split("+")]
+                conversations = []
+                # Sorted so the same symptoms in any order make the same prompt and share a cached answer
+                symptoms_text = ', '.join(sorted(selected_symptom_names))
+                for system in systems:
+                    prompt = f"Given these symptoms: {symptoms_text}, provide a {system.lower()} diagnosis and possible remedies."
+                    conversations.append([
+                        {"role": "user", "content": prompt}
+                    ])
                 if api_key:
-                    response = stream_chatbot_response(messages, api_key, placeholder)
-                    add_history_entry(user_id, "inference", {
-                        "symptoms": selected_symptom_names,
-                        "result": response,
-                        "inference_type": inference_type
-                    })
+                    columns = st.columns(len(systems))
+                    placeholders = []
+                    for col, system in zip(columns, systems):
+                        if len(systems) > 1:
+                            col.markdown(f"**{system}**")
+                        placeholders.append(col.empty())
+                    responses = stream_chatbot_responses(conversations, api_key, placeholders, cache=True)
+                    for system, response in zip(systems, responses):
+                        if response:
+                            add_history_entry(user_id, "inference", {
+                                "symptoms": selected_symptom_names,
+                                "result": response,
+                                "inference_type": f"{system} (LLM)"
+                            })
                 else:
                     st.info("Please provide your HuggingFace API Key above.")
             
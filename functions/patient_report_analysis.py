@@ -1,9 +1,12 @@
 import streamlit as st
+import hashlib
+import io
 import os
 import json
 import re
-from google import genai
+from utils.cache import content_hash, result_cache
 from utils.database import get_doctors
+from utils.gemini import get_gemini_client
 from utils.user_history import add_history_entry
 
 
@@ -23,6 +26,44 @@ def extract_json(text):
             pass
     return None
 
+GEMINI_MODEL = "gemini-1.5-flash"
+ANALYSIS_PROMPT = "Analyze this medical report and suggest the top 1-2 doctor specializations to consult, and explain why. Respond ONLY in this JSON format: {\"specializations\": [\"specialization1\", ...], \"explanation\": \"...\"}"
+TESTS_PROMPT = "Given the medical report and the suggested specialization ({specialization}), recommend further diagnostic tests to pinpoint the disease, along with their approximate costs in INR (Rs). Present as a list."
+# Changing the model or either prompt invalidates cached analyses
+PROMPT_VERSION = hashlib.sha256(f"{GEMINI_MODEL}\0{ANALYSIS_PROMPT}\0{TESTS_PROMPT}".encode()).hexdigest()[:16]
+
+# Gemini answers per (report bytes, prompt version); reruns and re-uploads skip the API.
+# Only answers with parsed specializations are kept, for MEDAI_REPORT_CACHE_TTL seconds
+REPORT_CACHE_TTL = float(os.environ.get("MEDAI_REPORT_CACHE_TTL", str(7 * 24 * 3600)))
+report_cache = result_cache("reports", ttl=REPORT_CACHE_TTL or None)
+
+def analyze_report(file_bytes, file_ext):
+    '''Upload the report to Gemini once and ask for specializations, then for further tests.'''
+    client = get_gemini_client(GEMINI_API_KEY)
+    if file_ext == '.pdf':
+        mime_type = 'application/pdf'
+    else:
+        mime_type = 'image/jpeg' if file_ext in ['.jpeg', '.jpg'] else 'image/png'
+    sample_doc = client.files.upload(
+        file=io.BytesIO(file_bytes),
+        config=dict(mime_type=mime_type)
+    )
+    response = client.models.generate_content(
+        model=GEMINI_MODEL,
+        contents=[sample_doc, ANALYSIS_PROMPT]
+    )
+    ai_text = response.text
+    tests_text = None
+    result_json = extract_json(ai_text)
+    if result_json and 'specializations' in result_json:
+        # Call Gemini API again for test recommendations
+        test_response = client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=[sample_doc, TESTS_PROMPT.format(specialization=', '.join(result_json['specializations']))]
+        )
+        tests_text = test_response.text
+    return {"ai_text": ai_text, "tests_text": tests_text}
+
 def show():
     st.title("Medical Report Analysis (AI)")
     st.info("Upload your medical report (PDF, PNG, JPEG). Gemini AI will analyze and suggest a specialist.")
@@ -38,54 +79,37 @@ def show():
             st.error("Gemini API key not set. Please contact admin.")
             return
         try:
-            import io
-            file_bytes = uploaded_file.read()
+            file_bytes = uploaded_file.getvalue()
             file_name = uploaded_file.name
             file_ext = os.path.splitext(file_name)[1].lower()
-            client = genai.Client(api_key=GEMINI_API_KEY)
-            prompt = "Analyze this medical report and suggest the top 1-2 doctor specializations to consult, and explain why. Respond ONLY in this JSON format: {\"specializations\": [\"specialization1\", ...], \"explanation\": \"...\"}"
-            if file_ext == '.pdf':
-                file_io = io.BytesIO(file_bytes)
-                sample_doc = client.files.upload(
-                    file=file_io,
-                    config=dict(mime_type='application/pdf')
-                )
-                response = client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=[sample_doc, prompt]
-                )
-            else:
-                file_io = io.BytesIO(file_bytes)
-                sample_doc = client.files.upload(
-                    file=file_io,
-                    config=dict(mime_type='image/jpeg' if file_ext in ['.jpeg', '.jpg'] else 'image/png')
-                )
-                response = client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=[sample_doc, prompt]
-                )
-            ai_text = response.text
+            cache_key = content_hash(file_bytes, file_ext, PROMPT_VERSION)
+            analysis = report_cache.get(cache_key)
+            if analysis is None:
+                with st.spinner("Analyzing report..."):
+                    analysis = analyze_report(file_bytes, file_ext)
+                parsed = extract_json(analysis["ai_text"])
+                # An unparsable answer is not cached, so the next upload asks again.
+                # Only fresh answers are stored, so reruns don't extend the TTL
+                if parsed and 'specializations' in parsed:
+                    report_cache.set(cache_key, analysis)
+            ai_text = analysis["ai_text"]
+            tests_text = analysis["tests_text"]
             result_json = extract_json(ai_text)
             if result_json and 'specializations' in result_json:
                 specialization = ', '.join(result_json['specializations'])
                 user_id = st.session_state.user.get("id")
                 st.success(f"Recommended Specialist: {specialization}")
                 st.markdown(f"**AI Explanation:** {result_json.get('explanation', '')}")
-                # Ask Gemini for further tests and costs
-                test_prompt = f"Given the medical report and the suggested specialization ({specialization}), recommend further diagnostic tests to pinpoint the disease, along with their approximate costs in INR (Rs). Present as a list."
-                # Call Gemini API again for test recommendations
-                test_response = client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=[sample_doc, test_prompt]
-                )
-                tests_text = test_response.text
                 st.info("**Recommended Further Tests & Costs:**\n" + tests_text)
-                # Save to user history
-                add_history_entry(user_id, "report_analysis", {
-                    "file_name": file_name,
-                    "specialization": specialization,
-                    "tests": tests_text
-                })
+                # Save to user history once per report, not on every rerun
+                recorded = st.session_state.setdefault("recorded_reports", set())
+                if cache_key not in recorded:
+                    add_history_entry(user_id, "report_analysis", {
+                        "file_name": file_name,
+                        "specialization": specialization,
+                        "tests": tests_text
+                    })
+                    recorded.add(cache_key)
                 doctors = get_doctors()
                 matched = [doc for doc in doctors if any(
                     spec.lower() in doc.get('specialization', '').lower() for spec in result_json['specializations'])]
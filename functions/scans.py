@@ -1,30 +1,261 @@
 import streamlit as st
-from PIL import Image
 import numpy as np
-import json
-from tensorflow import keras
+import pandas as pd
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from tensorflow.keras.applications.efficientnet import preprocess_input
+from utils.cache import content_hash, result_cache
+from utils.model_registry import get_model, model_version, track_inference
+from utils.scan_models import (
+    RESIZE_REDUCING_GAP,
+    SCAN_BACKEND,
+    SCAN_BATCH_SIZE,
+    decode_scan_image,
+    fill_scan_array,
+    load_class_names,
+    pad_batch,
+)
+from utils.scan_worker import REQUEST_TIMEOUT_SECONDS, get_scan_pool
+
+# Results per (image bytes, model files, backend), so reruns and re-uploads skip inference
+scan_result_cache = result_cache("scans")
 
-@st.cache_resource(show_spinner=False)
 def get_brain_model():
     try:
-        model = keras.models.load_model("./models/pkl/tumor.h5")
-        with open("./models/pkl/tumor_class_names.json") as f:
-            class_names = json.load(f)
-        return model, class_names
+        return get_model("brain_tumor")
     except Exception as e:
         st.error(f"Failed to load brain tumor model or class names. Error: {e}")
         return None, None
 
-def preprocess_brain_image(image, target_size=(224, 224)):
-    image = image.resize(target_size)
-    img_array = np.array(image)
-    if img_array.ndim == 2:
-        img_array = np.stack([img_array]*3, axis=-1)
-    img_array = img_array[..., :3]  # Ensure 3 channels
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = preprocess_input(img_array)  # EfficientNet preprocessing
-    return img_array.astype(np.float32)
+def get_cataract_model():
+    try:
+        return get_model("cataract")
+    except Exception as e:
+        st.error(f"Failed to load cataract model or class names. Error: {e}")
+        return None, None
+
+def preprocess_scan_image(image, target_size=(224, 224), out=None):
+    '''
+    Resize and EfficientNet-preprocess one image. Writes into out (an
+    H x W x 3 float32 slot of a batch) when given, else returns a (1, H, W, 3) array.
+    '''
+    if out is None:
+        return preprocess_scan_image(image, target_size, np.empty((1, *target_size, 3), dtype=np.float32)[0])[np.newaxis]
+    if image.size != tuple(target_size):
+        image = image.resize(target_size, reducing_gap=RESIZE_REDUCING_GAP)
+    fill_scan_array(image, out)
+    processed = preprocess_input(out)  # EfficientNet preprocessing (a pass-through today)
+    if processed is not out:
+        out[...] = processed
+    return out
+
+def preprocess_brain_image(image, target_size=(224, 224), out=None):
+    return preprocess_scan_image(image, target_size, out)
+
+def preprocess_cataract_image(image, target_size=(224, 224), out=None):
+    return preprocess_scan_image(image, target_size, out)
+
+def load_scan_images(uploaded_files, preprocess, target_size=(224, 224)):
+    '''
+    Decode and preprocess uploads in parallel, straight into one preallocated
+    float32 batch. Returns (batch, errors, seconds) aligned with the uploads;
+    rows that failed are left zeroed.
+    '''
+    batch = np.zeros((len(uploaded_files), *target_size, 3), dtype=np.float32)
+
+    def load(i):
+        start = time.perf_counter()
+        try:
+            preprocess(decode_scan_image(uploaded_files[i], target_size), target_size, out=batch[i])
+            return None, time.perf_counter() - start
+        except Exception as e:
+            return str(e), time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+        results = list(pool.map(load, range(len(uploaded_files))))
+    return batch, [r[0] for r in results], [r[1] for r in results]
+
+def predict_in_batches(model, images, batch_size=SCAN_BATCH_SIZE):
+    '''
+    Run images through the model in batches of at most batch_size, each
+    padded only to a small power of two. Returns one row of outputs per image
+    and each image's share of its batch's inference time.
+    '''
+    outputs, seconds = [], []
+    for start in range(0, len(images), batch_size):
+        n = len(images[start:start + batch_size])
+        batch = pad_batch(images[start:start + batch_size], batch_size)
+        batch_start = time.perf_counter()
+        outputs.append(np.asarray(model.predict_on_batch(batch))[:n])
+        seconds.extend([(time.perf_counter() - batch_start) / n] * n)
+    return (np.concatenate(outputs) if outputs else np.empty((0, 0))), seconds
+
+def predict_with_workers(pool, model_name, images, progress=None):
+    '''Submit images to the worker pool and poll until every result is back.'''
+    request_id = pool.submit(model_name, images)
+    deadline = time.monotonic() + REQUEST_TIMEOUT_SECONDS
+    while True:
+        result = pool.poll(request_id)
+        if result is not None:
+            break
+        if time.monotonic() > deadline:
+            pool.cancel(request_id)
+            raise TimeoutError(f"Scan workers did not answer within {REQUEST_TIMEOUT_SECONDS:.0f}s")
+        if progress is not None:
+            progress.caption(f"Waiting for scan workers (queue depth {pool.metrics()['queue_depth']})...")
+        time.sleep(0.05)
+    if progress is not None:
+        progress.empty()
+    failed = [error for error in result["errors"] if error]
+    if failed:
+        raise RuntimeError(failed[0])
+    return np.stack(result["outputs"]) if len(images) else np.empty((0, 0)), [info["inference_seconds"] for info in result["infos"]]
+
+def analyze_scans(uploaded_files, model, class_names, preprocess, model_name=None, pool=None, progress=None):
+    '''
+    Preprocess and classify a set of uploads; returns a results table and timings.
+    With a worker pool, inference runs out of process and model may be None.
+    Uploads already seen with the same model files are answered from scan_result_cache.
+    '''
+    keys = [None] * len(uploaded_files)
+    results = {}
+    if model_name:
+        version = f"{model_version(model_name)}-{SCAN_BACKEND}"
+        for i, uploaded_file in enumerate(uploaded_files):
+            keys[i] = content_hash(uploaded_file.getvalue(), model_name, version)
+            cached = scan_result_cache.get(keys[i])
+            if cached is not None:
+                results[i] = {**cached, "cached": True}
+    pending = [i for i in range(len(uploaded_files)) if i not in results]
+
+    start = time.perf_counter()
+    images, errors, preprocess_times = load_scan_images([uploaded_files[i] for i in pending], preprocess)
+    preprocess_seconds = time.perf_counter() - start
+    valid = [j for j, error in enumerate(errors) if error is None]
+    # Only copy the batch when some uploads failed to decode
+    batch = images if len(valid) == len(images) else images[valid]
+    start = time.perf_counter()
+    if not valid:
+        preds, inference_times = [], []
+    elif pool is not None:
+        preds, inference_times = predict_with_workers(pool, model_name, batch, progress)
+    elif model_name:
+        with track_inference(model_name, items=len(valid)):
+            preds, inference_times = predict_in_batches(model, batch)
+    else:
+        preds, inference_times = predict_in_batches(model, batch)
+    inference_seconds = time.perf_counter() - start
+
+    for j, probs, inference_time in zip(valid, preds, inference_times):
+        i = pending[j]
+        results[i] = {
+            "probs": np.asarray(probs, dtype=float).tolist(),
+            "preprocess_ms": preprocess_times[j] * 1000,
+            "inference_ms": inference_time * 1000,
+        }
+        if keys[i] is not None:
+            scan_result_cache.set(keys[i], results[i])
+        results[i]["cached"] = False
+    errors_by_index = {pending[j]: error for j, error in enumerate(errors) if error is not None}
+
+    rows = []
+    for i, uploaded_file in enumerate(uploaded_files):
+        row = {"File": uploaded_file.name}
+        if i in results:
+            probs = results[i]["probs"]
+            row["Prediction"] = class_names[int(np.argmax(probs))]
+            row["Confidence"] = float(np.max(probs))
+            row.update({name: float(p) for name, p in zip(class_names, probs)})
+            row["Preprocess (ms)"] = results[i]["preprocess_ms"]
+            row["Inference (ms)"] = results[i]["inference_ms"]
+            row["Cached"] = results[i]["cached"]
+        else:
+            row["Prediction"] = "Error"
+            row["Error"] = errors_by_index[i]
+        rows.append(row)
+    timings = {
+        "images": len(results),
+        "cached": sum(result["cached"] for result in results.values()),
+        "preprocess_seconds": preprocess_seconds,
+        "inference_seconds": inference_seconds,
+        "total_seconds": preprocess_seconds + inference_seconds,
+    }
+    preds = np.array([results[i]["probs"] for i in sorted(results)])
+    return pd.DataFrame(rows), preds, timings
+
+def show_scan_results(results, preds, timings):
+    if len(results) == 1 and len(preds) == 1:
+        st.success(f"Inference Result: {results.iloc[0]['Prediction']}")
+        st.markdown(f"**Raw Model Output:** {preds[0].tolist()}")
+    else:
+        st.dataframe(results, hide_index=True, use_container_width=True)
+    for _, row in results[results["Prediction"] == "Error"].iterrows():
+        st.error(f"Could not process {row['File']}. Please ensure it is a valid image. Error: {row['Error']}")
+    if timings["images"]:
+        st.caption(
+            f"Analyzed {timings['images']} image(s) in {timings['total_seconds']:.2f}s "
+            f"(preprocessing {timings['preprocess_seconds']:.2f}s, inference {timings['inference_seconds']:.2f}s, "
+            f"{timings['total_seconds'] / timings['images'] * 1000:.0f} ms/image, {SCAN_BACKEND} backend"
+            + (f", {timings['cached']} from cache)" if timings["cached"] else ")")
+        )
+
+# Scan tabs backed by an on-box model
+SCAN_ANALYZERS = {
+    "Brain Tumor Scan": {
+        "heading": "Upload Brain MRI Scans for AI Analysis",
+        "label": "Upload MRI Images (PNG, JPG, JPEG)",
+        "key": "brain_mri_upload",
+        "model_name": "brain_tumor",
+        "get_model": get_brain_model,
+        "preprocess": preprocess_brain_image,
+        "image_kind": "MRI images",
+    },
+    "Cataract Scan": {
+        "heading": "Upload Eye Images for AI Analysis",
+        "label": "Upload Eye Images (PNG, JPG, JPEG)",
+        "key": "cataract_upload",
+        "model_name": "cataract",
+        "get_model": get_cataract_model,
+        "preprocess": preprocess_cataract_image,
+        "image_kind": "eye images",
+    },
+}
+
+def show_scan_analyzer(analyzer):
+    st.markdown("---")
+    st.markdown(f"#### {analyzer['heading']}")
+    uploaded_scans = st.file_uploader(
+        analyzer["label"],
+        type=["png", "jpg", "jpeg"],
+        accept_multiple_files=True,
+        key=analyzer["key"]
+    )
+    if uploaded_scans:
+        try:
+            pool = get_scan_pool()
+            if pool is not None:
+                # Inference runs in the worker processes; only class names are needed here
+                model, class_names = None, load_class_names(analyzer["model_name"])
+            else:
+                model, class_names = analyzer["get_model"]()
+                if model is None or class_names is None:
+                    return
+            with st.spinner(f"Analyzing {len(uploaded_scans)} scan(s)..."):
+                results, preds, timings = analyze_scans(
+                    uploaded_scans, model, class_names, analyzer["preprocess"], analyzer["model_name"],
+                    pool=pool, progress=st.empty()
+                )
+            show_scan_results(results, preds, timings)
+            if pool is not None:
+                metrics = pool.metrics()
+                if metrics["mean_batch_size"]:
+                    st.caption(
+                        f"Scan workers: {metrics['workers_alive']}/{metrics['workers']} alive, "
+                        f"mean batch {metrics['mean_batch_size']:.1f}, p50 queue wait {metrics['p50_queue_ms']:.0f} ms"
+                    )
+        except Exception as e:
+            st.error(f"Could not process the scans. Please ensure they are valid {analyzer['image_kind']}. Error: {e}")
 
 def show():
     st.title("Medical Scans")
@@ -56,27 +287,7 @@ def show():
             st.subheader(scan_name)
             st.write(f"**Description**: {scan_info['description']}")
             st.markdown(f"**Details**: {scan_info['details']}")
-            if scan_name == "Brain Tumor Scan":
-                st.markdown("---")
-                st.markdown("#### Upload a Brain MRI Scan for AI Analysis")
-                uploaded_scan = st.file_uploader(
-                    "Upload MRI Image (PNG, JPG, JPEG)",
-                    type=["png", "jpg", "jpeg"],
-                    key="brain_mri_upload"
-                )
-                if uploaded_scan is not None:
-                    try:
-                        image = Image.open(uploaded_scan).convert("RGB")
-                        model, class_names = get_brain_model()
-                        if model is None or class_names is None:
-                            return
-                        img_array = preprocess_brain_image(image)
-                        preds = model.predict(img_array)
-                        pred_class = np.argmax(preds, axis=1)[0]
-                        label = class_names[pred_class]
-                        st.success(f"Inference Result: {label}")
-                        st.markdown(f"**Raw Model Output:** {preds[0].tolist()}")
-                    except Exception as e:
-                        st.error(f"Could not process the scan. Please ensure it is a valid MRI image. Error: {e}")
+            if scan_name in SCAN_ANALYZERS:
+                show_scan_analyzer(SCAN_ANALYZERS[scan_name])
             if st.button("Learn More", key=f"learn_{scan_name}"):
                 st.info("More detailed resources coming soon!")
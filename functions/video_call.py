@@ -1,13 +1,16 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import tempfile
-import os
 from utils.user_history import add_history_entry
-from utils.database import get_patient_appointments, get_doctor_appointments, save_prescription
+from utils.cache import content_hash
+from utils.database import (
+    TRANSCRIPT_PAGE_SIZE, add_transcripts, get_doctor_appointments, get_patient_appointments, get_transcripts,
+    save_prescription
+)
 from datetime import datetime, timedelta
 import requests
-from vosk import Model, KaldiRecognizer
-import wave
+from utils.speech import LONG_AUDIO_SECONDS, format_timestamp, stream_transcription, transcribe_long, wav_duration
+from utils.stream_render import StreamRenderer
+from utils.gemini import get_gemini_client
 import json
 import audio_recorder_streamlit
 
@@ -18,33 +21,28 @@ def generate_meeting_url(appointment_id):
     room_name = f"MedAI_{appointment_id}"
     return base_url + room_name
 
-def speech_to_text(audio_bytes):
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_audio:
-        tmp_audio.write(audio_bytes)
-        tmp_audio_path = tmp_audio.name
-    wf = wave.open(tmp_audio_path, "rb")
-    model = Model("vosk-model-small-en-us-0.15")  # Free English model
-    rec = KaldiRecognizer(model, wf.getframerate())
-    result = ""
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
-            res = json.loads(rec.Result())
-            result += res.get("text", "")
-    res = json.loads(rec.FinalResult())
-    result += res.get("text", "")
-    wf.close()
-    os.remove(tmp_audio_path)
-    return result.strip()
+def speech_to_text(audio_bytes, on_update=None):
+    '''
+    Transcribe a recording in memory with the shared Vosk model; returns the
+    text and timing info. on_update is called with the text recognized so far.
+    '''
+    phrases = []
+    for result in stream_transcription(audio_bytes):
+        if "final" in result:
+            phrases.append(result["final"])
+            if on_update:
+                on_update(" ".join(phrases))
+        elif "partial" in result:
+            if on_update:
+                on_update(result["partial"])
+        else:
+            return result["text"], result["info"]
 
 def generate_prescription(transcript):
     # Use Gemini or Hugging Face LLM to generate prescription
     if not GEMINI_API_KEY:
         return "Gemini API key not set."
-    from google import genai
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    client = get_gemini_client(GEMINI_API_KEY)
     prompt = (
         "Given the following transcript of a doctor's instructions, generate a structured medical prescription including: "+
         "1) Medicines (name, dosage, frequency), 2) Diagnosis, 3) Next steps/recommendations. Format as a clear prescription.\nTranscript: " + transcript
@@ -58,7 +56,7 @@ def generate_prescription(transcript):
 def ai_summarize_meeting(messages):
     if not GEMINI_API_KEY:
         return "Gemini API key not set."
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    client = get_gemini_client(GEMINI_API_KEY)
     chat_text = '\n'.join([f"{m['role']}: {m['content']}" for m in messages])
     prompt = (
         "Given the following doctor-patient chat and AI-detected symptoms, summarize the meeting. "
@@ -71,15 +69,22 @@ def ai_summarize_meeting(messages):
     )
     return response.text.strip()
 
-def get_transcription_history(appointment_id):
-    if f"transcription_history_{appointment_id}" not in st.session_state:
-        st.session_state[f"transcription_history_{appointment_id}"] = []
-    return st.session_state[f"transcription_history_{appointment_id}"]
+def load_consultation_transcript(appointment_id):
+    '''
+    All transcript entries of an appointment, in order. Kept in the session
+    and extended page by page, so a rerun only reads entries added since.
+    '''
+    state = st.session_state.setdefault(f"transcripts_{appointment_id}", {"entries": [], "cursor": None})
+    while True:
+        entries, state["cursor"] = get_transcripts(appointment_id, TRANSCRIPT_PAGE_SIZE, state["cursor"])
+        state["entries"].extend(entries)
+        if len(entries) < TRANSCRIPT_PAGE_SIZE:
+            return state["entries"]
 
-def add_transcription_history(appointment_id, transcript):
-    history = get_transcription_history(appointment_id)
-    history.append(transcript)
-    st.session_state[f"transcription_history_{appointment_id}"] = history
+def format_transcript_entry(entry):
+    if entry.get("start") is not None:
+        return f"`{format_timestamp(entry['start'])}` {entry['text']}"
+    return entry["text"]
 
 def show():
     st.title("Video Consultation")
@@ -134,32 +139,62 @@ def show():
                 recording_color="#e63946",
                 neutral_color="#457b9d"
             )
-            if audio_bytes:
+            # The recorder returns the last recording on every rerun; transcribe each one once
+            audio_key = content_hash(audio_bytes) if audio_bytes else None
+            if audio_bytes and st.session_state.get(f"last_recording_{appointment_id}") != audio_key:
                 st.audio(audio_bytes, format='audio/wav')
-                with st.spinner("Transcribing audio..."):
-                    transcript = speech_to_text(audio_bytes)
-                    add_transcription_history(appointment_id, transcript)
-                    st.success("Transcript added to history.")
-                if st.button("Transcribe & Generate Prescription", key=f"transcribe_{appointment_id}"):
-                    with st.spinner("Generating prescription..."):
-                        prescription = generate_prescription(transcript)
-                        st.write("**Prescription:**")
-                        st.code(prescription)
-                        # Save prescription for both doctor and patient
-                        save_prescription(appointment_id, user_id, prescription)
-                        st.success("Prescription saved for both doctor and patient.")
+                live_transcript = st.empty()
+                live_transcript.caption("Transcribing audio...")
+                audio_seconds = wav_duration(audio_bytes)
+                if audio_seconds > LONG_AUDIO_SECONDS:
+                    # Long consultation: transcribe silence-separated segments in parallel
+                    progress = st.progress(0.0)
+                    transcribed = [0.0]
+
+                    def show_progress(segment):
+                        transcribed[0] += segment["end"] - segment["start"]
+                        progress.progress(min(1.0, transcribed[0] / audio_seconds))
+
+                    result = transcribe_long(audio_bytes, on_segment=show_progress)
+                    progress.empty()
+                    timing = result["info"]
+                    entries = [segment for segment in result["segments"] if segment["text"]]
+                    live_transcript.markdown("\n\n".join(format_transcript_entry(entry) for entry in entries))
+                else:
+                    live = StreamRenderer(live_transcript, format=lambda text: f"_{text}_")
+                    transcript, timing = speech_to_text(audio_bytes, on_update=live.replace)
+                    live.close(transcript)
+                    entries = [{"text": transcript}] if transcript else []
+                add_transcripts(appointment_id, user_id, entries)
+                st.session_state[f"last_recording_{appointment_id}"] = audio_key
+                st.success("Transcript added to history.")
+                if timing["real_time_factor"] is not None:
+                    st.caption(
+                        f"Transcribed {timing['audio_seconds']:.1f}s of audio in {timing['seconds']:.2f}s "
+                        f"(real-time factor {timing['real_time_factor']:.2f})"
+                    )
         else:
             st.info("Only the doctor can record and save prescriptions.")
 
-        # Show transcription history below
+        # Shared by doctor and patient, and kept across reconnects
         st.subheader("Transcription History")
-        history = get_transcription_history(appointment_id)
+        history = load_consultation_transcript(appointment_id)
         if history:
-            for idx, t in enumerate(history, 1):
-                st.markdown(f"**{idx}.** {t}")
+            for idx, entry in enumerate(history, 1):
+                st.markdown(f"**{idx}.** {format_transcript_entry(entry)}")
         else:
             st.info("No transcriptions yet.")
 
+        if user_type == 'doctor' and history:
+            if st.button("Generate Prescription from Consultation", key=f"transcribe_{appointment_id}"):
+                with st.spinner("Generating prescription..."):
+                    prescription = generate_prescription("\n".join(format_transcript_entry(entry) for entry in history))
+                    st.write("**Prescription:**")
+                    st.code(prescription)
+                    # Save prescription for both doctor and patient
+                    save_prescription(appointment_id, user_id, prescription)
+                    st.success("Prescription saved for both doctor and patient.")
+
         st.subheader("Tips for a Successful Call")
         st.markdown("""
         - Ensure a stable internet connection.
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Upload-result caches: entries held in memory, and on disk too when a directory is set
+RESULT_CACHE_SIZE = int(os.environ.get("MEDAI_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_DIR = os.environ.get("MEDAI_RESULT_CACHE_DIR", "")
+
+_MISSING = object()
+
+def content_hash(data, *versions):
+    '''SHA-256 of uploaded bytes plus whatever versions the result depends on (model, prompt).'''
+    digest = hashlib.sha256(data)
+    for version in versions:
+        digest.update(b"\0" + str(version).encode())
+    return digest.hexdigest()
+
+class LRUCache:
+    '''
+    Thread-safe LRU cache with an optional time-to-live per entry.
+    Keeps hit/miss/eviction counters for reporting.
+    '''
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        self._put(key, value, time.monotonic() + self.ttl if self.ttl else None)
+
+    def _put(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+class DiskLRUCache(LRUCache):
+    '''
+    LRUCache backed by one JSON file per entry, so results survive restarts
+    and are shared by processes using the same directory. Keys must be safe
+    file names (e.g. content hashes) and values JSON-serializable. The
+    directory keeps at most max_files entries, least recently used removed first.
+    Each file stores its write time: the TTL counts from the write, while the
+    file's mtime tracks the last use for trimming.
+    '''
+
+    def __init__(self, directory, maxsize=1024, ttl=None, max_files=None):
+        super().__init__(maxsize, ttl)
+        self.directory = directory
+        self.max_files = max_files or maxsize
+        self.disk_hits = 0
+        self._file_count = 0
+        os.makedirs(directory, exist_ok=True)
+        self._trim()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _trim(self):
+        try:
+            files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+            files.sort(key=os.path.getmtime)
+            excess = max(0, len(files) - self.max_files)
+            for path in files[:excess]:
+                os.remove(path)
+            self._file_count = len(files) - excess
+        except OSError as e:
+            print(f"Warning: could not trim cache directory '{self.directory}': {e}")
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            created_at = entry["created_at"]
+            if self.ttl and created_at + self.ttl <= time.time():
+                os.remove(path)
+                self._file_count -= 1
+                return default
+            # mtime is the last-used time for trimming; the expiry stays tied to created_at
+            os.utime(path)
+        except (OSError, ValueError, TypeError, KeyError):
+            return default
+        with self._lock:
+            self.misses -= 1
+            self.hits += 1
+            self.disk_hits += 1
+        expires_at = time.monotonic() + (created_at + self.ttl - time.time()) if self.ttl else None
+        self._put(key, entry["value"], expires_at)
+        return entry["value"]
+
+    def set(self, key, value):
+        super().set(key, value)
+        path = self._path(key)
+        try:
+            existed = os.path.exists(path)
+            # Write then rename so concurrent readers never see a partial file
+            with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+                json.dump({"created_at": time.time(), "value": value}, f)
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: could not persist cache entry to '{path}': {e}")
+            return
+        if not existed:
+            self._file_count += 1
+        # Other processes may add files too; _trim recounts the directory
+        if self._file_count > self.max_files:
+            self._trim()
+
+    def clear(self):
+        super().clear()
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+        self._file_count = 0
+
+    def stats(self):
+        return {**super().stats(), "disk_hits": self.disk_hits, "directory": self.directory}
+
+def result_cache(name, maxsize=RESULT_CACHE_SIZE, ttl=None):
+    '''A cache for expensive results, persisted under MEDAI_RESULT_CACHE_DIR/<name> when set.'''
+    if RESULT_CACHE_DIR:
+        return DiskLRUCache(os.path.join(RESULT_CACHE_DIR, name), maxsize=maxsize, ttl=ttl, max_files=maxsize * 4)
+    return LRUCache(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,219 @@
+import asyncio
+import codecs
+import json
+import os
+import queue
+import re
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# HTTP settings for the streaming LLM endpoints
+CHAT_CONNECT_TIMEOUT = float(os.environ.get("MEDAI_CHAT_CONNECT_TIMEOUT", "5"))
+# Longest wait for the next bytes of a response, not for the whole answer
+CHAT_READ_TIMEOUT = float(os.environ.get("MEDAI_CHAT_READ_TIMEOUT", "60"))
+CHAT_POOL_SIZE = int(os.environ.get("MEDAI_CHAT_POOL_SIZE", "16"))
+CHAT_RETRIES = int(os.environ.get("MEDAI_CHAT_RETRIES", "3"))
+CHAT_BACKOFF_SECONDS = float(os.environ.get("MEDAI_CHAT_BACKOFF_SECONDS", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_NEWLINE = re.compile(r"\r\n|\r|\n")
+_DONE = "[DONE]"
+
+_session = None
+_session_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+_async_client = None
+
+class SSEParser:
+    '''
+    Incremental parser for text/event-stream bodies. Bytes can be fed in
+    chunks of any size; a UTF-8 character or line ending split across two
+    chunks is held back until the rest arrives. Returns the data of each
+    complete event (multi-line data joined with newlines).
+    '''
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._data = []
+
+    def feed(self, chunk):
+        self._buffer += self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        events = []
+        position = 0
+        for match in _NEWLINE.finditer(self._buffer):
+            # A trailing "\r" may be the first half of "\r\n"
+            if match.group() == "\r" and match.end() == len(self._buffer):
+                break
+            event = self._line(self._buffer[position:match.start()])
+            if event is not None:
+                events.append(event)
+            position = match.end()
+        self._buffer = self._buffer[position:]
+        return events
+
+    def close(self):
+        '''Events left at the end of the stream, for servers that omit the final blank line.'''
+        events = self.feed(self._decoder.decode(b"", final=True) + "\n\n") if self._buffer or self._data else []
+        self._buffer = ""
+        return events
+
+    def _line(self, line):
+        if not line:
+            if not self._data:
+                return None
+            data = "\n".join(self._data)
+            self._data = []
+            return data
+        if line.startswith(":"):
+            return None
+        field, _, value = line.partition(":")
+        if field == "data":
+            self._data.append(value[1:] if value.startswith(" ") else value)
+        return None
+
+def parse_events(events):
+    '''(JSON chunks, done) from event data; done once the stream sends [DONE].'''
+    chunks = []
+    for data in events:
+        if data.strip() == _DONE:
+            return chunks, True
+        chunks.append(json.loads(data))
+    return chunks, False
+
+def get_session():
+    '''Process-wide requests session; keeps connections to the LLM endpoints alive between turns.'''
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=CHAT_RETRIES,
+                connect=CHAT_RETRIES,
+                read=0,
+                status=CHAT_RETRIES,
+                status_forcelist=RETRY_STATUSES,
+                # Retries happen before any of the body is read, so POST is safe to repeat
+                allowed_methods=frozenset({"POST"}),
+                backoff_factor=CHAT_BACKOFF_SECONDS,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=CHAT_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def stream_chat(url, headers, payload):
+    '''POST a streaming chat request and yield the JSON chunks as they arrive.'''
+    parser = SSEParser()
+    with get_session().post(
+        url, headers=headers, json=payload, stream=True,
+        timeout=(CHAT_CONNECT_TIMEOUT, CHAT_READ_TIMEOUT),
+    ) as response:
+        response.raise_for_status()
+        done = False
+        # Read to the end of the body even after [DONE], so the connection goes back to the pool
+        for data in response.iter_content(chunk_size=None):
+            if not done:
+                chunks, done = parse_events(parser.feed(data))
+                yield from chunks
+        if not done:
+            chunks, _ = parse_events(parser.close())
+            yield from chunks
+
+def get_async_client():
+    '''httpx client owned by the background event loop; only use it from coroutines on that loop.'''
+    global _async_client
+    if _async_client is None:
+        import httpx
+
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(CHAT_READ_TIMEOUT, connect=CHAT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=CHAT_POOL_SIZE, max_keepalive_connections=CHAT_POOL_SIZE),
+        )
+    return _async_client
+
+async def astream_chat(url, headers, payload):
+    '''Async version of stream_chat, with the same retry policy for failures before the first byte.'''
+    import httpx
+
+    client = get_async_client()
+    for attempt in range(CHAT_RETRIES + 1):
+        last_attempt = attempt == CHAT_RETRIES
+        try:
+            async with client.stream("POST", url, headers=headers, json=payload) as response:
+                if response.status_code in RETRY_STATUSES and not last_attempt:
+                    await asyncio.sleep(retry_delay(attempt, response.headers.get("Retry-After")))
+                    continue
+                response.raise_for_status()
+                parser = SSEParser()
+                done = False
+                async for data in response.aiter_bytes():
+                    if not done:
+                        chunks, done = parse_events(parser.feed(data))
+                        for chunk in chunks:
+                            yield chunk
+                if not done:
+                    chunks, _ = parse_events(parser.close())
+                    for chunk in chunks:
+                        yield chunk
+                return
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if last_attempt:
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+
+def retry_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return CHAT_BACKOFF_SECONDS * (2 ** attempt)
+
+def get_event_loop():
+    '''One daemon thread runs every async stream in the process.'''
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="medai-chat-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+async def _pump(index, url, headers, payload, results):
+    try:
+        async for chunk in astream_chat(url, headers, payload):
+            results.put((index, chunk, None))
+        results.put((index, None, None))
+    except Exception as e:
+        results.put((index, None, e))
+
+def stream_many(jobs):
+    '''
+    Run several (url, headers, payload) streams at once on the shared event
+    loop and yield (index, chunk, error) in arrival order. Each stream ends
+    with chunk None, and error set if it failed.
+    '''
+    loop = get_event_loop()
+    results = queue.Queue()
+    futures = [
+        asyncio.run_coroutine_threadsafe(_pump(index, url, headers, payload, results), loop)
+        for index, (url, headers, payload) in enumerate(jobs)
+    ]
+    remaining = len(futures)
+    try:
+        while remaining:
+            index, chunk, error = results.get()
+            if chunk is None:
+                remaining -= 1
+            yield index, chunk, error
+    finally:
+        # The caller stopped early (e.g. a Streamlit rerun): drop the other streams
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,131 @@
+import json
+import os
+from utils.cache import LRUCache, content_hash
+
+# Per-request budget for the chatbot conversation sent to the LLM
+CHAT_CONTEXT_TOKENS = int(os.environ.get("MEDAI_CHAT_CONTEXT_TOKENS", "3000"))
+# Most recent messages always sent verbatim (user and assistant count separately)
+CHAT_RECENT_MESSAGES = int(os.environ.get("MEDAI_CHAT_RECENT_MESSAGES", "6"))
+# Older messages are folded into the summary this many at a time, so it is not rewritten every turn
+CHAT_FOLD_MESSAGES = int(os.environ.get("MEDAI_CHAT_FOLD_MESSAGES", "4"))
+CHAT_SUMMARY_TOKENS = int(os.environ.get("MEDAI_CHAT_SUMMARY_TOKENS", "300"))
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SYSTEM_PROMPT = (
+    "You are MedAI, a medical assistant. Answer health questions clearly and concisely, "
+    "say when something needs a doctor's examination, and recommend emergency care for urgent symptoms."
+)
+SUMMARY_PROMPT = (
+    "Update the summary of a conversation between a patient and a medical assistant. Keep symptoms, "
+    "durations, medications, allergies, conditions and advice given; drop small talk. "
+    "Reply with the summary only, in at most {words} words.\n\n"
+    "Current summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+# Summaries by (previous summary, folded messages), shared by all sessions
+summary_cache = LRUCache(maxsize=512)
+
+def estimate_tokens(text):
+    '''Rough token count (about four characters per token for English); no tokenizer download needed.'''
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def message_tokens(messages):
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def trim_to_tokens(text, tokens):
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    return cut[:cut.rfind(" ")] if " " in cut else cut
+
+def format_messages(messages):
+    return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+
+def fallback_summary(summary, messages, tokens):
+    '''Used when the summarizer fails: the newest folded text, truncated, after the old summary.'''
+    text = "\n".join(part for part in (summary, format_messages(messages)) if part)
+    limit = tokens * CHARS_PER_TOKEN
+    return text[-limit:].split(" ", 1)[-1] if len(text) > limit else text
+
+class ChatContext:
+    '''
+    Builds the messages sent for each chatbot turn from the full chat history:
+    a pinned system prompt, a rolling summary of older turns, and the most
+    recent messages verbatim, within a token budget. Keep one per session;
+    it remembers how much of the history the summary already covers.
+    '''
+
+    def __init__(self, system_prompt=SYSTEM_PROMPT, max_tokens=CHAT_CONTEXT_TOKENS,
+                 recent_messages=CHAT_RECENT_MESSAGES, fold_messages=CHAT_FOLD_MESSAGES,
+                 summary_tokens=CHAT_SUMMARY_TOKENS):
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.recent_messages = recent_messages
+        self.fold_messages = fold_messages
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.summarized = 0
+        self.summary_calls = 0
+        self.last_tokens = 0
+
+    def build(self, history, summarize=None):
+        '''
+        Messages for the next request. summarize(messages) returns the LLM's
+        reply to a summary prompt; without it (or if it fails) older turns
+        are kept as truncated text instead.
+        '''
+        if len(history) < self.summarized:
+            # The history was cleared or replaced
+            self.summary, self.summarized = "", 0
+        start = self.summarized
+        if len(history) - start > self.recent_messages + self.fold_messages:
+            start = len(history) - self.recent_messages
+        budget = self.max_tokens - estimate_tokens(self.system_prompt) - self.summary_tokens - MESSAGE_OVERHEAD_TOKENS
+        while start < len(history) - 1 and message_tokens(history[start:]) > budget:
+            start += 1
+        # Start the window on a user message
+        while start < len(history) - 1 and history[start]["role"] != "user":
+            start += 1
+        if start > self.summarized:
+            self.summary = self._fold(history[self.summarized:start], summarize)
+            self.summarized = start
+
+        system = self.system_prompt
+        if self.summary:
+            system += f"\n\nSummary of the earlier conversation:\n{self.summary}"
+        messages = [{"role": "system", "content": system}, *history[start:]]
+        self.last_tokens = message_tokens(messages)
+        return messages
+
+    def _fold(self, messages, summarize):
+        key = content_hash(json.dumps([self.summary, messages]).encode(), self.summary_tokens)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            return cached
+        summary = None
+        if summarize is not None:
+            prompt = SUMMARY_PROMPT.format(
+                words=int(self.summary_tokens * 0.75),
+                summary=self.summary or "(none)",
+                messages=format_messages(messages),
+            )
+            try:
+                self.summary_calls += 1
+                summary = trim_to_tokens(summarize([{"role": "user", "content": prompt}]).strip(), self.summary_tokens)
+            except Exception as e:
+                print(f"Warning: could not summarize chat history: {e}")
+        if not summary:
+            return fallback_summary(self.summary, messages, self.summary_tokens)
+        summary_cache.set(key, summary)
+        return summary
+
+    def stats(self):
+        return {
+            "tokens": self.last_tokens,
+            "max_tokens": self.max_tokens,
+            "summarized_messages": self.summarized,
+            "summary_tokens": estimate_tokens(self.summary),
+            "summary_calls": self.summary_calls,
+        }
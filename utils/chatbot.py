@@ -1,10 +1,25 @@
 import json
+import os
+import re
 import requests
 import streamlit as st
+from utils.cache import content_hash, result_cache
+from utils.chat_client import stream_chat, stream_many
+from utils.stream_render import StreamRenderer
 
-API_URL = "https://router.huggingface.co/nebius/v1/chat/completions"
+# OpenAI-compatible endpoint; MEDAI_LLM_BASE_URL can point at a local stand-in (benchmarks.mock_llm_server)
+LLM_BASE_URL = os.environ.get("MEDAI_LLM_BASE_URL", "https://router.huggingface.co/nebius/v1")
+API_URL = f"{LLM_BASE_URL.rstrip('/')}/chat/completions"
+DEFAULT_MODEL = "aaditya/Llama3-OpenBioLLM-70B"
 
-def query_chatbot(messages, api_key, model="aaditya/Llama3-OpenBioLLM-70B", max_tokens=512, stream=True):
+# Completed answers to identical requests, replayed as a stream (on disk too under MEDAI_RESULT_CACHE_DIR/llm)
+LLM_CACHE_SIZE = int(os.environ.get("MEDAI_LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = float(os.environ.get("MEDAI_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+REPLAY_CHUNK_CHARS = 64
+
+llm_cache = result_cache("llm", maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL or None)
+
+def chat_request(messages, api_key, model=DEFAULT_MODEL, max_tokens=512, stream=True):
     headers = {"Authorization": f"Bearer {api_key}"}
     payload = {
         "messages": messages,
@@ -12,18 +27,88 @@ def query_chatbot(messages, api_key, model="aaditya/Llama3-OpenBioLLM-70B", max_
         "model": model,
         "stream": stream,
     }
-    response = requests.post(API_URL, headers=headers, json=payload, stream=True)
-    for line in response.iter_lines():
-        if not line.startswith(b"data:"):
+    return API_URL, headers, payload
+
+def normalize_messages(messages):
+    '''Roles and contents with whitespace runs collapsed, so formatting differences share a cache entry.'''
+    return [
+        {"role": message["role"], "content": re.sub(r"\s+", " ", message["content"]).strip()}
+        for message in messages
+    ]
+
+def cache_key(messages, model=DEFAULT_MODEL, max_tokens=512):
+    request = {"model": model, "max_tokens": max_tokens, "messages": normalize_messages(messages)}
+    return content_hash(json.dumps(request, sort_keys=True).encode(), API_URL)
+
+def replay_chunks(text, chunk_chars=REPLAY_CHUNK_CHARS):
+    '''A cached answer in the shape of streamed chunks, so callers handle both the same way.'''
+    for start in range(0, len(text), chunk_chars):
+        yield {"choices": [{"delta": {"content": text[start:start + chunk_chars]}}], "cached": True}
+
+def query_chatbot(messages, api_key, model=DEFAULT_MODEL, max_tokens=512, stream=True, cache=False):
+    '''
+    Stream the reply chunks. With cache=True an identical earlier request is
+    replayed from llm_cache, and a reply that streams to completion is stored.
+    '''
+    if not cache:
+        yield from stream_chat(*chat_request(messages, api_key, model, max_tokens, stream))
+        return
+    key = cache_key(messages, model, max_tokens)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        yield from replay_chunks(cached)
+        return
+    parts = []
+    for chunk in stream_chat(*chat_request(messages, api_key, model, max_tokens, stream)):
+        parts.append(chunk_text(chunk))
+        yield chunk
+    if any(parts):
+        llm_cache.set(key, "".join(parts))
+
+def chunk_text(chunk):
+    '''Text delta of a streamed chunk; usage-only chunks have no choices.'''
+    choices = chunk.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+def complete_chat(messages, api_key, model=DEFAULT_MODEL, max_tokens=512):
+    '''The whole reply as one string, for requests that are not shown while streaming.'''
+    return "".join(chunk_text(chunk) for chunk in query_chatbot(messages, api_key, model=model, max_tokens=max_tokens))
+
+def stream_chatbot_response(messages, api_key, placeholder, model=DEFAULT_MODEL, cache=False):
+    renderer = StreamRenderer(placeholder)
+    try:
+        for chunk in query_chatbot(messages, api_key, model=model, cache=cache):
+            renderer.append(chunk_text(chunk))
+    except (requests.RequestException, ValueError) as e:
+        st.error(f"The AI assistant could not respond: {e}")
+    return renderer.close()
+
+def stream_chatbot_responses(conversations, api_key, placeholders, model=DEFAULT_MODEL, cache=False, max_tokens=512):
+    '''
+    Stream several conversations at once (one placeholder each) over the
+    shared async client, without a thread per request. Returns the texts in
+    order. With cache=True, cached answers are shown at once and only the rest are requested.
+    '''
+    renderers = [StreamRenderer(placeholder) for placeholder in placeholders]
+    keys = [cache_key(messages, model, max_tokens) for messages in conversations]
+    pending = []
+    for index in range(len(conversations)):
+        cached = llm_cache.get(keys[index]) if cache else None
+        if cached is None:
+            pending.append(index)
+        else:
+            renderers[index].append(cached)
+            renderers[index].close()
+
+    jobs = [chat_request(conversations[index], api_key, model, max_tokens) for index in pending]
+    for job_index, chunk, error in stream_many(jobs):
+        index = pending[job_index]
+        if chunk is not None:
+            renderers[index].append(chunk_text(chunk))
             continue
-        if line.strip() == b"data: [DONE]":
-            return
-        yield json.loads(line.decode("utf-8").lstrip("data:").rstrip("/n"))
-
-def stream_chatbot_response(messages, api_key, placeholder, model="aaditya/Llama3-OpenBioLLM-70B"):
-    text = ""
-    for chunk in query_chatbot(messages, api_key, model=model):
-        delta = chunk["choices"][0]["delta"].get("content", "")
-        text += delta
-        placeholder.markdown(text)
-    return text
+        renderers[index].close()
+        if error is not None:
+            st.error(f"The AI assistant could not respond: {error}")
+        elif cache and renderers[index].text:
+            llm_cache.set(keys[index], renderers[index].text)
+    return [renderer.close() for renderer in renderers]
@@ -1,8 +1,28 @@
+import atexit
+import os
+import threading
+import time as time_module
+from firebase_admin import firestore
 from firebase_config import get_db
 from datetime import datetime
 
 db = get_db()
 
+# Consultation transcripts are buffered and written in batches: as soon as
+# TRANSCRIPT_BATCH_SIZE entries are pending, otherwise by a background flush
+# every TRANSCRIPT_FLUSH_SECONDS
+TRANSCRIPT_BATCH_SIZE = int(os.environ.get("MEDAI_TRANSCRIPT_BATCH_SIZE", "20"))
+TRANSCRIPT_FLUSH_SECONDS = float(os.environ.get("MEDAI_TRANSCRIPT_FLUSH_SECONDS", "2"))
+TRANSCRIPT_PAGE_SIZE = 50
+# Firestore accepts at most 500 writes per batch
+FIRESTORE_MAX_BATCH = 500
+
+_transcript_buffer = []
+_transcript_lock = threading.Lock()
+# Held for a whole flush, so batches are committed one at a time and in queue order
+_transcript_flush_lock = threading.Lock()
+_transcript_flusher = None
+
 def get_user_by_id(user_id):
     user_doc = db.collection('users').document(user_id).get()
     if user_doc.exists:
@@ -138,3 +158,83 @@ def save_prescription(appointment_id, doctor_id, prescription):
     # Optionally, attach prescription to appointment
     db.collection('appointments').document(appointment_id).update({'prescription': prescription, 'prescription_created_at': datetime.now()})
     return True
+
+def _transcripts_ref(appointment_id):
+    return db.collection('appointments').document(appointment_id).collection('transcripts')
+
+def add_transcripts(appointment_id, user_id, entries):
+    """
+    Queue transcript entries (dicts with at least 'text'; long recordings add
+    'start'/'end' offsets in seconds) for an appointment. They are written in
+    batches, so this returns without a database round trip.
+    """
+    global _transcript_flusher
+    now = datetime.now()
+    with _transcript_lock:
+        for entry in entries:
+            _transcript_buffer.append((appointment_id, {
+                **entry,
+                'user_id': user_id,
+                'seq': time_module.time_ns(),
+                'created_at': now,
+            }))
+        full = len(_transcript_buffer) >= TRANSCRIPT_BATCH_SIZE
+        if _transcript_flusher is None:
+            _transcript_flusher = threading.Thread(target=_flush_transcripts_periodically, name="transcript-flush", daemon=True)
+            _transcript_flusher.start()
+            atexit.register(flush_transcripts)
+    if full:
+        flush_transcripts()
+
+def flush_transcripts():
+    """Write every buffered transcript entry; entries are put back if a batch fails."""
+    with _transcript_flush_lock:
+        with _transcript_lock:
+            pending = _transcript_buffer[:]
+            _transcript_buffer.clear()
+        for start in range(0, len(pending), FIRESTORE_MAX_BATCH):
+            chunk = pending[start:start + FIRESTORE_MAX_BATCH]
+            try:
+                batch = db.batch()
+                for appointment_id, entry in chunk:
+                    # Readers page by commit time, so entries flushed late still come after the cursor
+                    batch.set(_transcripts_ref(appointment_id).document(), {**entry, 'committed_at': firestore.SERVER_TIMESTAMP})
+                batch.commit()
+            except Exception as e:
+                print(f"Warning: could not write {len(pending) - start} transcript entries, will retry: {e}")
+                with _transcript_lock:
+                    _transcript_buffer[:0] = pending[start:]
+                return False
+        return True
+
+def _flush_transcripts_periodically():
+    while True:
+        time_module.sleep(TRANSCRIPT_FLUSH_SECONDS)
+        with _transcript_lock:
+            pending = bool(_transcript_buffer)
+        if pending:
+            flush_transcripts()
+
+def get_transcripts(appointment_id, limit=TRANSCRIPT_PAGE_SIZE, after=None):
+    """
+    One page of an appointment's transcript in write order, starting after
+    the cursor returned by the previous page. Returns (entries, cursor).
+    Ordering by committed_at then seq needs the composite index in
+    firestore.indexes.json.
+    """
+    with _transcript_lock:
+        pending = any(apt_id == appointment_id for apt_id, _ in _transcript_buffer)
+    if pending:
+        # Read our own writes
+        flush_transcripts()
+    query = _transcripts_ref(appointment_id).order_by('committed_at').order_by('seq')
+    if after is not None:
+        query = query.start_after(after)
+    entries = []
+    for doc in query.limit(limit).get():
+        entry = doc.to_dict()
+        entry['id'] = doc.id
+        entries.append(entry)
+    if not entries:
+        return entries, after
+    return entries, {'committed_at': entries[-1]['committed_at'], 'seq': entries[-1]['seq']}
@@ -0,0 +1,209 @@
+import json
+import sys
+import numpy as np
+
+# The compiled model is a flat .npz next to the pickle; predictions only need NumPy
+COMPILED_MODEL_PATH = "./models/pkl/disease_prediction_model.npz"
+
+TREE_MODELS = ("DecisionTreeClassifier", "ExtraTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier")
+
+def export_trees(estimators):
+    '''
+    Concatenate fitted trees into flat node arrays. Child indices are made
+    global and leaves point to themselves, which is how traversal spots them.
+    '''
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes) + offset
+        is_leaf = tree.children_left == -1
+        left = np.where(is_leaf, node_ids, tree.children_left + offset)
+        right = np.where(is_leaf, node_ids, tree.children_right + offset)
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(value / normalizer)
+        roots.append(offset)
+        offset += n_nodes
+    return {
+        "kind": np.array("trees"),
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+
+def export_model(model):
+    '''Convert a fitted scikit-learn classifier into a dict of NumPy arrays.'''
+    name = type(model).__name__
+    if name in ("DecisionTreeClassifier", "ExtraTreeClassifier"):
+        arrays = export_trees([model])
+    elif name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        arrays = export_trees(model.estimators_)
+    elif name == "LogisticRegression":
+        if model.coef_.shape[0] == 1:
+            raise ValueError("Binary LogisticRegression models are not supported.")
+        if getattr(model, "multi_class", "auto") == "ovr":
+            raise ValueError("One-vs-rest LogisticRegression models are not supported.")
+        arrays = {
+            "kind": np.array("linear"),
+            "weights": model.coef_.T.astype(np.float64),
+            "bias": model.intercept_.astype(np.float64),
+        }
+    elif name == "MultinomialNB":
+        arrays = {
+            "kind": np.array("linear"),
+            "weights": model.feature_log_prob_.T.astype(np.float64),
+            "bias": model.class_log_prior_.astype(np.float64),
+        }
+    elif name == "BernoulliNB":
+        if model.binarize is not None and model.binarize != 0.0:
+            raise ValueError("BernoulliNB with a non-zero binarize threshold is not supported.")
+        neg_prob = np.log(1 - np.exp(model.feature_log_prob_))
+        arrays = {
+            "kind": np.array("linear"),
+            "weights": (model.feature_log_prob_ - neg_prob).T.astype(np.float64),
+            "bias": (model.class_log_prior_ + neg_prob.sum(axis=1)).astype(np.float64),
+            "binarize": np.array(True),
+        }
+    else:
+        raise ValueError(f"Cannot compile a {name} model; supported: {', '.join(TREE_MODELS)}, LogisticRegression, MultinomialNB, BernoulliNB.")
+    classes = np.asarray(model.classes_)
+    arrays["classes"] = classes.astype(str) if classes.dtype == object else classes
+    arrays["n_features"] = np.array(model.n_features_in_)
+    arrays["model_type"] = np.array(name)
+    return arrays
+
+class CompiledModel:
+    '''predict_proba for an exported model using NumPy only.'''
+
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.classes_ = arrays["classes"]
+        self.n_features = int(arrays["n_features"])
+        self.model_type = str(arrays["model_type"])
+        self.source_version = str(arrays["source_version"]) if "source_version" in arrays else None
+        self.disease_names = arrays["disease_names"] if "disease_names" in arrays else None
+        if self.kind == "trees":
+            self.feature = arrays["feature"]
+            self.threshold = arrays["threshold"]
+            self.left = arrays["left"]
+            self.right = arrays["right"]
+            self.value = arrays["value"]
+            self.roots = arrays["roots"]
+        else:
+            self.weights = arrays["weights"]
+            self.bias = arrays["bias"]
+            self.binarize = bool(arrays["binarize"]) if "binarize" in arrays else False
+
+    @classmethod
+    def load(cls, path=COMPILED_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}.")
+        if self.kind == "trees":
+            # scikit-learn compares float32 features against float64 thresholds
+            return self._predict_trees(X.astype(np.float32))
+        if self.binarize:
+            X = (X > 0).astype(np.float64)
+        scores = X @ self.weights + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def _predict_trees(self, X):
+        # Symptom batches repeat a lot; score each distinct row once
+        if X.shape[0] > 1:
+            unique_rows, inverse = np.unique(X, axis=0, return_inverse=True)
+            if unique_rows.shape[0] < X.shape[0]:
+                return self._walk_trees(unique_rows)[inverse.reshape(-1)]
+        return self._walk_trees(X)
+
+    def _walk_trees(self, X):
+        # Walk all (row, tree) pairs together, dropping pairs as they reach a leaf
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        rows = np.repeat(np.arange(n_rows), n_trees)
+        nodes = np.tile(self.roots, n_rows)
+        pending = np.arange(n_rows * n_trees)
+        leaves = np.empty(n_rows * n_trees, dtype=self.roots.dtype)
+        while pending.size:
+            at_leaf = self.left[nodes] == nodes
+            if at_leaf.any():
+                leaves[pending[at_leaf]] = nodes[at_leaf]
+                walking = ~at_leaf
+                pending, rows, nodes = pending[walking], rows[walking], nodes[walking]
+                if not pending.size:
+                    break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaves = leaves.reshape(n_rows, n_trees)
+        # Accumulate per tree, like scikit-learn, so the sums match bit for bit
+        proba = self.value[leaves[:, 0]].copy()
+        for tree in range(1, n_trees):
+            proba += self.value[leaves[:, tree]]
+        if n_trees > 1:
+            proba /= n_trees
+        return proba
+
+def verify(model, compiled, X, atol=1e-9):
+    '''Compare the compiled predictor with the original model on X.'''
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    max_abs_diff = float(np.abs(expected - actual).max())
+    argmax_mismatches = int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum())
+    return {
+        "rows": int(X.shape[0]),
+        "max_abs_diff": max_abs_diff,
+        "argmax_mismatches": argmax_mismatches,
+        "equivalent": max_abs_diff <= atol and argmax_mismatches == 0,
+    }
+
+def compile_model(model, label_encoder, X, source_version, path=COMPILED_MODEL_PATH):
+    '''
+    Export model, check it against the original on X and write it to path.
+    Returns the verification report; nothing is written if it fails.
+    '''
+    arrays = export_model(model)
+    arrays["source_version"] = np.array(source_version)
+    arrays["disease_names"] = label_encoder.inverse_transform(np.arange(len(label_encoder.classes_))).astype(str)
+    report = verify(model, CompiledModel(arrays), X)
+    if report["equivalent"]:
+        np.savez_compressed(path, **arrays)
+    return report
+
+def main():
+    import joblib
+    import pandas as pd
+    from utils import disease_prediction
+    from utils.symptom_vocabulary import CSV_PATH
+
+    model = joblib.load(disease_prediction.MODEL_PATH)
+    label_encoder = joblib.load(disease_prediction.LABEL_ENCODER_PATH)
+    # Equivalence check against the original model on every training row
+    df = pd.read_csv(CSV_PATH)
+    X = df[disease_prediction.symptom_columns].to_numpy(dtype=np.float64)
+    report = compile_model(model, label_encoder, X, disease_prediction.artifact_version())
+    print(json.dumps(report, indent=2))
+    if not report["equivalent"]:
+        print("Compiled model does not match the original; nothing written.")
+        return 1
+    print(f"Wrote {type(model).__name__} model to {COMPILED_MODEL_PATH}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
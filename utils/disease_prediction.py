@@ -1,29 +1,231 @@
-import pandas as pd
+import hashlib
+import os
+import time
+import weakref
 import numpy as np
-import joblib
+from utils import model_registry
+from utils.cache import LRUCache
+from utils.disease_model_export import COMPILED_MODEL_PATH, CompiledModel
+from utils.symptom_vocabulary import load_vocabulary
 
-# Load model and label encoder
-model = joblib.load("./models/pkl/disease_prediction_model.pkl")
-label_encoder = joblib.load("./models/pkl/label_encoder.pkl")
+MODEL_PATH = "./models/pkl/disease_prediction_model.pkl"
+LABEL_ENCODER_PATH = "./models/pkl/label_encoder.pkl"
+ARTIFACT_PATHS = (MODEL_PATH, LABEL_ENCODER_PATH)
+# Set to 0 to always serve predictions through scikit-learn
+USE_COMPILED_MODEL = os.environ.get("MEDAI_COMPILED_MODEL", "1") == "1"
 
-# Load symptom list
-df = pd.read_csv("./models/csv/Training.csv")
-symptom_columns = df.columns.drop(["prognosis", *[col for col in df.columns if "Unnamed" in col]])
+# Cache of top-5 results keyed on the canonical symptom set and model version
+prediction_cache = LRUCache(
+    maxsize=int(os.environ.get("MEDAI_PREDICTION_CACHE_SIZE", "4096")),
+    ttl=float(os.environ.get("MEDAI_PREDICTION_CACHE_TTL", "3600")) or None,
+)
 
-# Function to predict probabilities of diseases from symptom list
-def predict_disease(symptoms):
-    input_data = np.zeros(len(symptom_columns))
+def artifact_version(paths=ARTIFACT_PATHS):
+    '''Content hash of the model and label encoder files.'''
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+class ModelUnavailableError(RuntimeError):
+    pass
+
+class DiseaseModel:
+    '''Loaded model, label encoder and decoded class names; held by the model registry.'''
+
+    def __init__(self):
+        self.model = None
+        self.backend = None
+        self.label_encoder = None
+        self.disease_names = None
+        self.version = None
+        self.error = None
+        self.timings = {}
+
+    @property
+    def available(self):
+        return self.model is not None
+
+    def load(self):
+        self.timings = {}
+        self.error = None
+        missing = [path for path in ARTIFACT_PATHS if not os.path.exists(path)]
+        if missing:
+            self.error = f"Missing model artifact: {missing[0]}"
+            print(f"Warning: {self.error}")
+            return
+        start = time.perf_counter()
+        self.version = artifact_version()
+        self.timings["hash_seconds"] = time.perf_counter() - start
+        if USE_COMPILED_MODEL and self.load_compiled():
+            self.timings["loaded_at"] = time.time()
+            return
+        try:
+            import joblib
+
+            start = time.perf_counter()
+            self.model = joblib.load(MODEL_PATH)
+            self.timings["model_load_seconds"] = time.perf_counter() - start
+            start = time.perf_counter()
+            self.label_encoder = joblib.load(LABEL_ENCODER_PATH)
+            self.timings["label_encoder_load_seconds"] = time.perf_counter() - start
+        except Exception as e:
+            self.model = self.label_encoder = self.disease_names = None
+            self.error = f"Could not load model artifacts: {e}"
+            print(f"Warning: {self.error}")
+            return
+        # Decode every class once instead of on each prediction
+        self.disease_names = self.label_encoder.inverse_transform(np.arange(len(self.label_encoder.classes_)))
+        self.backend = "sklearn"
+        self.timings["loaded_at"] = time.time()
+
+    def load_compiled(self):
+        '''Use the NumPy export when it was built from the current pickle.'''
+        if not os.path.exists(COMPILED_MODEL_PATH):
+            return False
+        start = time.perf_counter()
+        try:
+            compiled = CompiledModel.load(COMPILED_MODEL_PATH)
+        except Exception as e:
+            print(f"Warning: could not load '{COMPILED_MODEL_PATH}' ({e}), using scikit-learn.")
+            return False
+        if compiled.source_version != self.version or compiled.disease_names is None:
+            print(f"Warning: '{COMPILED_MODEL_PATH}' is stale, using scikit-learn.")
+            return False
+        self.model = compiled
+        self.disease_names = compiled.disease_names.astype(object)
+        self.backend = "numpy"
+        self.timings["model_load_seconds"] = time.perf_counter() - start
+        return True
+
+def load_disease_model():
+    '''Registry loader. A missing artifact gives an unavailable model rather than an error.'''
+    model = DiseaseModel()
+    model.load()
+    return model
+
+def warmup_disease_model(model):
+    if model.available:
+        predict_disease_batch([[]])
+
+# The model the prediction cache was filled from. A weak reference, so a model
+# the registry evicts is freed instead of being kept alive here
+_model_ref = None
 
-    for symptom in symptoms:
-        if symptom in symptom_columns:
-            input_data[symptom_columns.get_loc(symptom)] = 1
-        else:
-            print(f"Warning: '{symptom}' is not a recognized symptom.")
+def get_model():
+    '''
+    Return the DiseaseModel from the model registry, which loads it on first
+    use and reloads it when the artifacts change on disk. Cached predictions
+    are dropped whenever a different model is returned.
+    '''
+    global _model_ref
+    model = model_registry.get_model("disease_symptoms")
+    if _model_ref is None or _model_ref() is not model:
+        prediction_cache.clear()
+        _model_ref = weakref.ref(model)
+    return model
 
-    # Get probabilities
-    probabilities = model.predict_proba([input_data])[0]
-    disease_names = label_encoder.inverse_transform(np.arange(len(probabilities)))
+def _current_model():
+    return _model_ref() if _model_ref is not None else None
+
+def require_model():
+    model = get_model()
+    if not model.available:
+        raise ModelUnavailableError(model.error)
+    return model
+
+def is_model_available():
+    return get_model().available
+
+def warmup(background=True):
+    '''Load the model and run one prediction, optionally in a background thread.'''
+    return model_registry.warmup_models(["disease_symptoms"], background=background)
+
+def model_status():
+    model = _current_model()
+    if model is None:
+        return {"loaded": False, "available": None, "error": None, "timings": {}}
+    registry_metrics = model_registry.model_metrics()["models"]["disease_symptoms"]
+    return {
+        "loaded": True,
+        "available": model.available,
+        "version": model.version,
+        "backend": model.backend,
+        "error": model.error,
+        "timings": {
+            **model.timings,
+            "registry_load_seconds": registry_metrics["load_seconds"],
+            "warmup_seconds": registry_metrics["warmup_seconds"],
+        },
+    }
+
+# Load symptom list from the precompiled vocabulary
+vocabulary = load_vocabulary()
+symptom_columns = vocabulary["columns"]
+symptom_index = vocabulary["index"]
+
+def encode_symptoms(list_of_symptom_lists):
+    '''Build one dense 0/1 feature matrix, one row per symptom list.'''
+    input_data = np.zeros((len(list_of_symptom_lists), len(symptom_columns)))
+    for row, symptoms in enumerate(list_of_symptom_lists):
+        for symptom in symptoms:
+            col = symptom_index.get(symptom)
+            if col is not None:
+                input_data[row, col] = 1
+            else:
+                print(f"Warning: '{symptom}' is not a recognized symptom.")
+    return input_data
+
+def top_k_indices(probabilities, top_k):
+    '''
+    Column indices of the top_k probabilities of every row, highest first.
+    Ties keep ascending class order, exactly like a stable descending sort.
+    '''
+    n_rows, n_classes = probabilities.shape
+    top_k = min(top_k, n_classes)
+    if top_k <= 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+    # Value of the k-th largest entry in every row
+    kth = -np.partition(-probabilities, top_k - 1, axis=1)[:, top_k - 1:top_k]
+    above = probabilities > kth
+    tied = probabilities == kth
+    # Take the lowest-index ties needed to fill exactly top_k slots
+    needed = top_k - above.sum(axis=1, keepdims=True)
+    selected = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+    candidates = np.nonzero(selected)[1].reshape(n_rows, top_k)
+    candidate_probs = np.take_along_axis(probabilities, candidates, axis=1)
+    order = np.argsort(-candidate_probs, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+# Function to predict probabilities of diseases for many symptom lists at once
+def predict_disease_batch(list_of_symptom_lists, top_k=5):
+    if len(list_of_symptom_lists) == 0:
+        return []
+    model = require_model()
+    input_data = encode_symptoms(list_of_symptom_lists)
+    with model_registry.track_inference("disease_symptoms", items=len(list_of_symptom_lists)):
+        probabilities = model.model.predict_proba(input_data)
+    top = top_k_indices(probabilities, top_k)
+    return [
+        list(zip(model.disease_names[idx], probs[idx]))
+        for idx, probs in zip(top, probabilities)
+    ]
+
+def prediction_cache_key(symptoms, version):
+    return (tuple(sorted(set(symptoms))), version)
+
+# Function to predict probabilities of diseases from symptom list
+def predict_disease(symptoms):
+    model = require_model()
+    key = prediction_cache_key(symptoms, model.version)
+    results = prediction_cache.get(key)
+    if results is None:
+        results = predict_disease_batch([symptoms])[0]
+        prediction_cache.set(key, results)
+    return list(results)
 
-    # Combine and sort results
-    results = sorted(zip(disease_names, probabilities), key=lambda x: x[1], reverse=True)
-    return results[:5]
\ No newline at end of file
+def prediction_cache_stats():
+    model = _current_model()
+    return {"model_version": model.version if model else None, **prediction_cache.stats()}
@@ -0,0 +1,21 @@
+import os
+import threading
+
+# Point the Gemini SDK at another endpoint, e.g. the local stand-in from benchmarks.mock_llm_server
+GEMINI_BASE_URL = os.environ.get("MEDAI_GEMINI_BASE_URL", "")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_gemini_client(api_key):
+    '''One google-genai client per API key, reused across reruns so its HTTP connections stay open.'''
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from google import genai
+            from google.genai import types
+
+            http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+            client = genai.Client(api_key=api_key, http_options=http_options)
+            _clients[api_key] = client
+        return client
@@ -0,0 +1,329 @@
+'''
+Process-wide registry for every model the app serves. Models are registered
+by name with a loader and are loaded lazily on first use, reloaded when their
+files change on disk, optionally warmed up at boot, and evicted least recently
+used first when the loaded models exceed MEDAI_MODEL_MEMORY_MB (0 = no limit).
+'''
+import gc
+import hashlib
+import importlib
+import os
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MEMORY_BUDGET_MB = float(os.environ.get("MEDAI_MODEL_MEMORY_MB", "0"))
+
+class ModelLoadError(RuntimeError):
+    pass
+
+class ModelEntry:
+    def __init__(self, name, loader, paths=(), warmup=None, size_mb=None):
+        self.name = name
+        self.loader = loader
+        self.paths = tuple(paths)
+        self.warmup = warmup
+        self.declared_size_mb = size_mb
+        self.model = None
+        # Objects built from the model (e.g. recognizer pools), dropped with it
+        self.attached = {}
+        self.signature = None
+        self.size_mb = 0.0
+        self.error = None
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+        self.load_count = 0
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.evictions = 0
+        self.inference_count = 0
+        self.inference_items = 0
+        self.inference_seconds = 0.0
+        self.recent_latencies = deque(maxlen=1000)
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+_entries = {}
+_registry_lock = threading.Lock()
+# One model loads at a time, so the RSS growth measured around a load is that model's own
+_load_lock = threading.RLock()
+_warmup_threads = {}
+
+def resolve(target):
+    '''Accept a callable or a "package.module:attribute" string.'''
+    if callable(target) or target is None:
+        return target
+    module_name, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+def register_model(name, loader, paths=(), warmup=None, size_mb=None):
+    '''
+    Register a model. loader (and the optional warmup, called with the loaded
+    model) may be dotted "module:function" strings so registering a model does
+    not import its framework. paths are watched for changes.
+    '''
+    with _registry_lock:
+        _entries[name] = ModelEntry(name, loader, paths, warmup, size_mb)
+
+def registered_models():
+    return list(_entries)
+
+def path_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def model_version(name):
+    '''Short hash of a model's files (mtime and size), for keying cached results.'''
+    entry = _entries[name]
+    return hashlib.sha256(repr(path_signature(entry.paths)).encode()).hexdigest()[:16]
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def files_size_mb(paths):
+    total = 0
+    for path in paths:
+        for root, _, files in os.walk(path) if os.path.isdir(path) else [("", None, [path])]:
+            for file_name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+    return total / (1024 * 1024)
+
+def _drop(entry):
+    '''Forget a model and everything built from it; called with _registry_lock held.'''
+    entry.model = None
+    entry.attached.clear()
+
+def _load(entry):
+    with _load_lock:
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            model = resolve(entry.loader)()
+        except Exception as e:
+            with _registry_lock:
+                _drop(entry)
+            entry.error = f"{type(e).__name__}: {e}"
+            entry.signature = path_signature(entry.paths)
+            raise ModelLoadError(f"Could not load model '{entry.name}': {entry.error}") from e
+        entry.load_seconds = time.perf_counter() - start
+        rss_after = current_rss_mb()
+    if entry.declared_size_mb is not None:
+        entry.size_mb = entry.declared_size_mb
+    elif rss_before is not None and rss_after is not None and rss_after > rss_before:
+        entry.size_mb = rss_after - rss_before
+    else:
+        entry.size_mb = files_size_mb(entry.paths)
+    with _registry_lock:
+        _drop(entry)
+        entry.model = model
+    entry.error = None
+    entry.signature = path_signature(entry.paths)
+    entry.load_count += 1
+
+def _evict_over_budget(keep):
+    if MEMORY_BUDGET_MB <= 0:
+        return
+    evicted = False
+    with _registry_lock:
+        loaded = sorted((e for e in _entries.values() if e.loaded and e is not keep), key=lambda e: e.last_used)
+        total = sum(e.size_mb for e in loaded) + keep.size_mb
+        for entry in loaded:
+            if total <= MEMORY_BUDGET_MB:
+                break
+            # Only the registry holds models between calls; callers using it right now keep it until they finish
+            _drop(entry)
+            entry.evictions += 1
+            total -= entry.size_mb
+            evicted = True
+            print(f"Evicted model '{entry.name}' ({entry.size_mb:.0f} MB) to stay under {MEMORY_BUDGET_MB:.0f} MB")
+    if evicted:
+        # Framework models hold reference cycles; free them now rather than at the next collection
+        gc.collect()
+
+def get_model(name):
+    '''Return the loaded model, loading (or reloading after a file change) as needed.'''
+    entry = _entries.get(name)
+    if entry is None:
+        raise KeyError(f"Unknown model '{name}'")
+    entry.last_used = time.monotonic()
+    model = entry.model
+    if model is not None and (not entry.paths or path_signature(entry.paths) == entry.signature):
+        return model
+    with entry.lock:
+        if entry.model is None or (entry.paths and path_signature(entry.paths) != entry.signature):
+            if entry.model is None and entry.error and path_signature(entry.paths) == entry.signature:
+                # Failed before and nothing changed on disk; don't retry on every call
+                raise ModelLoadError(f"Could not load model '{name}': {entry.error}")
+            _load(entry)
+            _evict_over_budget(entry)
+        return entry.model
+
+def unload_model(name):
+    entry = _entries[name]
+    with entry.lock, _registry_lock:
+        _drop(entry)
+
+def get_attached(name, key, factory):
+    '''
+    An object built from the loaded model by factory(model), e.g. a pool of
+    recognizers. The registry keeps it with the model and drops it on
+    eviction, unload or reload, so it never pins an old model in memory.
+    Callers should fetch it on every use rather than keep it.
+    '''
+    entry = _entries[name]
+    model = get_model(name)
+    with _registry_lock:
+        attached = entry.attached.get(key)
+        if attached is None or attached[0] is not model:
+            attached = (model, factory(model))
+            if entry.model is model:
+                entry.attached[key] = attached
+        return attached[1]
+
+def peek_attached(name, key):
+    '''The attached object if its model is loaded, without loading anything.'''
+    attached = _entries[name].attached.get(key)
+    return attached[1] if attached is not None else None
+
+def _warmup(name):
+    entry = _entries[name]
+    start = time.perf_counter()
+    try:
+        model = get_model(name)
+        if entry.warmup is not None:
+            resolve(entry.warmup)(model)
+    except Exception as e:
+        print(f"Warning: warmup of model '{name}' failed: {e}")
+    entry.warmup_seconds = time.perf_counter() - start
+
+def _warmup_each(names):
+    for name in names:
+        _warmup(name)
+
+def warmup_models(names=None, background=True):
+    '''Load (and warm up) the given models, or all of them, once per process.'''
+    names = registered_models() if names is None else names
+    unknown = [name for name in names if name not in _entries]
+    if unknown:
+        print(f"Warning: cannot warm up unknown models: {', '.join(unknown)}")
+        names = [name for name in names if name in _entries]
+    if not background:
+        for name in names:
+            _warmup(name)
+        return []
+    threads = []
+    with _registry_lock:
+        if MEMORY_BUDGET_MB > 0:
+            # Under a budget, warm up one model at a time: a warmup running next to
+            # another model's load would be counted in that model's size
+            todo = [name for name in names if name not in _warmup_threads]
+            if todo:
+                thread = threading.Thread(target=_warmup_each, args=(todo,), name="warmup-models", daemon=True)
+                for name in todo:
+                    _warmup_threads[name] = thread
+                thread.start()
+        for name in names:
+            if name not in _warmup_threads:
+                thread = threading.Thread(target=_warmup, args=(name,), name=f"warmup-{name}", daemon=True)
+                _warmup_threads[name] = thread
+                thread.start()
+            if _warmup_threads[name] not in threads:
+                threads.append(_warmup_threads[name])
+    return threads
+
+@contextmanager
+def track_inference(name, items=1):
+    '''Time a block of inference against a model's metrics.'''
+    entry = _entries[name]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        entry.last_used = time.monotonic()
+        entry.inference_count += 1
+        entry.inference_items += items
+        entry.inference_seconds += elapsed
+        entry.recent_latencies.append(elapsed)
+
+def model_metrics():
+    metrics = {}
+    for name, entry in list(_entries.items()):
+        latencies = sorted(entry.recent_latencies)
+        metrics[name] = {
+            "loaded": entry.loaded,
+            "error": entry.error,
+            "size_mb": entry.size_mb,
+            "load_count": entry.load_count,
+            "load_seconds": entry.load_seconds,
+            "warmup_seconds": entry.warmup_seconds,
+            "evictions": entry.evictions,
+            "inference_count": entry.inference_count,
+            "inference_items": entry.inference_items,
+            "inference_seconds": entry.inference_seconds,
+            "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else None,
+        }
+    return {
+        "memory_budget_mb": MEMORY_BUDGET_MB,
+        "loaded_mb": sum(e.size_mb for e in _entries.values() if e.loaded),
+        "rss_mb": current_rss_mb(),
+        "models": metrics,
+    }
+
+# Models served by the app. Loaders are imported only when a model is first used.
+register_model(
+    "disease_symptoms",
+    "utils.disease_prediction:load_disease_model",
+    paths=(
+        "./models/pkl/disease_prediction_model.pkl",
+        "./models/pkl/label_encoder.pkl",
+        "./models/pkl/disease_prediction_model.npz",
+    ),
+    warmup="utils.disease_prediction:warmup_disease_model",
+)
+register_model(
+    "brain_tumor",
+    "utils.scan_models:load_tumor_model",
+    paths=(
+        "./models/pkl/tumor.h5",
+        "./models/pkl/tumor_class_names.json",
+        "./models/pkl/tumor_int8.tflite",
+        "./models/pkl/tumor_float16.tflite",
+    ),
+    warmup="utils.scan_models:warmup_scan_model",
+)
+register_model(
+    "cataract",
+    "utils.scan_models:load_cataract_model",
+    paths=(
+        "./models/pkl/cataract.h5",
+        "./models/pkl/cataract_class_names.json",
+        "./models/pkl/cataract_int8.tflite",
+        "./models/pkl/cataract_float16.tflite",
+    ),
+    warmup="utils.scan_models:warmup_scan_model",
+)
+register_model(
+    "vosk_en",
+    "utils.speech:load_vosk_model",
+    paths=("./vosk-model-small-en-us-0.15",),
+    warmup="utils.speech:warmup_recognizers",
+)
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+
+TUMOR_MODEL_PATH = "./models/pkl/tumor.h5"
+TUMOR_CLASS_NAMES_PATH = "./models/pkl/tumor_class_names.json"
+CATARACT_MODEL_PATH = "./models/pkl/cataract.h5"
+CATARACT_CLASS_NAMES_PATH = "./models/pkl/cataract_class_names.json"
+
+# Most images per model call; smaller batches are padded to a power of two, so
+# the model only sees a few shapes without computing a full batch of zeros
+SCAN_BATCH_SIZE = int(os.environ.get("MEDAI_SCAN_BATCH_SIZE", "16"))
+
+CLASS_NAMES_PATHS = {
+    "brain_tumor": TUMOR_CLASS_NAMES_PATH,
+    "cataract": CATARACT_CLASS_NAMES_PATH,
+}
+
+@lru_cache(maxsize=None)
+def load_class_names(model_name):
+    '''Class names without loading the model, e.g. when inference runs in a worker process.'''
+    with open(CLASS_NAMES_PATHS[model_name]) as f:
+        return json.load(f)
+
+# Downscale in integer steps (Image.reduce) until within this factor of the target, then resample
+RESIZE_REDUCING_GAP = 3.0
+
+def padded_size(n, batch_size=SCAN_BATCH_SIZE):
+    '''Batch length for n images: the next power of two, at most batch_size (n itself if larger).'''
+    if n >= batch_size:
+        return n
+    return min(batch_size, 1 << max(n - 1, 0).bit_length())
+
+def pad_batch(images, batch_size=SCAN_BATCH_SIZE):
+    '''
+    Images as one batch, zero-padded up to padded_size(len(images)). A slice
+    of a preallocated batch array that already has that length is used as is.
+    '''
+    n = len(images)
+    size = padded_size(n, batch_size)
+    if isinstance(images, np.ndarray) and n == size:
+        return images
+    first = np.asarray(images[0])
+    batch = np.zeros((size, *first.shape), dtype=first.dtype)
+    for i, image in enumerate(images):
+        batch[i] = image
+    return batch
+
+def decode_scan_image(source, target_size=(224, 224)):
+    '''
+    Open an upload and resize it to target_size as cheaply as possible:
+    JPEGs are decoded at the smallest DCT scale (1/2, 1/4, 1/8) that is still
+    at least target_size, and grayscale images stay single-channel until
+    they are written into the batch.
+    '''
+    image = Image.open(source)
+    if image.format == "JPEG":
+        image.draft(None, target_size)
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    if image.size != tuple(target_size):
+        image = image.resize(target_size, reducing_gap=RESIZE_REDUCING_GAP)
+    return image
+
+def fill_scan_array(image, out):
+    '''Write a resized L or RGB image into out (H, W, 3 float32), broadcasting gray across channels.'''
+    pixels = np.asarray(image)
+    out[...] = pixels[..., np.newaxis] if pixels.ndim == 2 else pixels[..., :3]
+    return out
+
+# "keras" serves the .h5 models; "int8" or "float16" serve their TFLite conversions
+# (python -m utils.scan_quantization) with a multi-threaded interpreter
+SCAN_BACKEND = os.environ.get("MEDAI_SCAN_BACKEND", "keras")
+TFLITE_THREADS = int(os.environ.get("MEDAI_TFLITE_THREADS", str(os.cpu_count() or 1)))
+
+def tflite_path(model_path, mode):
+    return os.path.splitext(model_path)[0] + f"_{mode}.tflite"
+
+class TFLiteClassifier:
+    '''
+    TFLite interpreter with the slice of the Keras API the scan pages use
+    (predict_on_batch and input_shape). The interpreter is not thread-safe,
+    so calls from concurrent sessions are serialized.
+    '''
+    def __init__(self, path, num_threads=TFLITE_THREADS):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.input_shape = (None, *self.input["shape"][1:])
+        self.batch_size = int(self.input["shape"][0])
+        self.lock = threading.Lock()
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self.lock:
+            if len(batch) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input["index"], [len(batch), *self.input_shape[1:]])
+                self.interpreter.allocate_tensors()
+                self.input = self.interpreter.get_input_details()[0]
+                self.output = self.interpreter.get_output_details()[0]
+                self.batch_size = len(batch)
+            scale, zero_point = self.input["quantization"]
+            if self.input["dtype"] != np.float32 and scale:
+                batch = np.round(batch / scale + zero_point)
+                # Saturate values outside the calibrated range; a plain cast would wrap them around
+                limits = np.iinfo(self.input["dtype"])
+                batch = np.clip(batch, limits.min, limits.max)
+            self.interpreter.set_tensor(self.input["index"], batch.astype(self.input["dtype"]))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+def load_scan_classifier(model_path, class_names_path, backend=SCAN_BACKEND):
+    '''Load a scan model with the configured backend, falling back to Keras if the conversion is missing.'''
+    if backend != "keras":
+        path = tflite_path(model_path, backend)
+        if os.path.exists(path):
+            with open(class_names_path) as f:
+                class_names = json.load(f)
+            return TFLiteClassifier(path), class_names
+        name = next((name for name, names_path in CLASS_NAMES_PATHS.items() if names_path == class_names_path), "brain_tumor")
+        print(
+            f"Warning: '{path}' not found, serving '{model_path}' with Keras. "
+            f"Run: python -m utils.scan_quantization {name} --samples <image folder> --mode {backend}"
+        )
+    return load_keras_classifier(model_path, class_names_path)
+
+def load_keras_classifier(model_path, class_names_path):
+    from tensorflow import keras
+
+    model = keras.models.load_model(model_path)
+    with open(class_names_path) as f:
+        class_names = json.load(f)
+    return model, class_names
+
+def load_tumor_model():
+    return load_scan_classifier(TUMOR_MODEL_PATH, TUMOR_CLASS_NAMES_PATH)
+
+def load_cataract_model():
+    return load_scan_classifier(CATARACT_MODEL_PATH, CATARACT_CLASS_NAMES_PATH)
+
+def warmup_scan_model(loaded):
+    '''Trace the model once for each batch shape used for real requests.'''
+    model, _ = loaded
+    for size in sorted({padded_size(n) for n in range(1, SCAN_BATCH_SIZE + 1)}):
+        model.predict_on_batch(np.zeros((size, *model.input_shape[1:]), dtype=np.float32))
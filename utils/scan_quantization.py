@@ -0,0 +1,185 @@
+'''
+Convert the scan models to quantized TFLite and compare them with the .h5
+originals. Sample images calibrate the int8 conversion and are the workload
+for the comparison; when they sit in sub-folders named after the model's
+classes, accuracy against those labels is reported too.
+
+    python -m utils.scan_quantization brain_tumor --samples DIR [--mode int8 float16]
+
+Serve the result with MEDAI_SCAN_BACKEND=int8 (or float16).
+'''
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+from PIL import Image
+
+from utils.scan_models import (
+    CATARACT_CLASS_NAMES_PATH,
+    CATARACT_MODEL_PATH,
+    SCAN_BATCH_SIZE,
+    TFLITE_THREADS,
+    TUMOR_CLASS_NAMES_PATH,
+    TUMOR_MODEL_PATH,
+    TFLiteClassifier,
+    load_keras_classifier,
+    pad_batch,
+    tflite_path,
+)
+
+SCAN_MODELS = {
+    "brain_tumor": (TUMOR_MODEL_PATH, TUMOR_CLASS_NAMES_PATH, "preprocess_brain_image"),
+    "cataract": (CATARACT_MODEL_PATH, CATARACT_CLASS_NAMES_PATH, "preprocess_cataract_image"),
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+def load_samples(sample_dir, preprocess, class_names, limit=None):
+    '''Preprocessed sample images and their labels (None when the folder is not a class name).'''
+    images, labels = [], []
+    for root, _, files in sorted(os.walk(sample_dir)):
+        label = os.path.basename(root)
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            with Image.open(os.path.join(root, file_name)) as image:
+                images.append(preprocess(image.convert("RGB"))[0])
+            labels.append(label if label in class_names else None)
+            if limit and len(images) >= limit:
+                return images, labels
+    return images, labels
+
+def convert(model, mode, calibration_images):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        def representative_dataset():
+            for image in calibration_images:
+                yield [image[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        # Integer kernels throughout; inputs and outputs stay float32 so the
+        # preprocessing and result handling are shared with the Keras model
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown quantization mode '{mode}'")
+    return converter.convert()
+
+def predict_all(model, images, batch_size):
+    outputs = []
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        outputs.append(np.asarray(model.predict_on_batch(pad_batch(chunk, batch_size)))[:len(chunk)])
+    return np.concatenate(outputs)
+
+def measure_latency(model, images, batch_size, repeats):
+    '''Per-call p50 for a single image and per-image time for a full batch.'''
+    single = images[0][np.newaxis]
+    model.predict_on_batch(single)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_on_batch(single)
+        samples.append(time.perf_counter() - start)
+    batch = pad_batch(images[:batch_size], batch_size)
+    model.predict_on_batch(batch)
+    batch_samples = []
+    for _ in range(max(1, repeats // 10)):
+        start = time.perf_counter()
+        model.predict_on_batch(batch)
+        batch_samples.append(time.perf_counter() - start)
+    return {
+        "single_p50_ms": float(np.percentile(samples, 50) * 1000),
+        "single_p99_ms": float(np.percentile(samples, 99) * 1000),
+        "batch_size": batch_size,
+        "batch_ms_per_image": float(np.median(batch_samples) / batch_size * 1000),
+    }
+
+def accuracy(outputs, labels, class_names):
+    labelled = [(output, label) for output, label in zip(outputs, labels) if label is not None]
+    if not labelled:
+        return None
+    return float(np.mean([class_names[int(np.argmax(output))] == label for output, label in labelled]))
+
+def compare(reference_outputs, candidate, images, labels, class_names, batch_size, repeats):
+    outputs = predict_all(candidate, images, batch_size)
+    return {
+        "top1_agreement": float(np.mean(outputs.argmax(axis=1) == reference_outputs.argmax(axis=1))),
+        "max_abs_diff": float(np.abs(outputs - reference_outputs).max()),
+        "accuracy": accuracy(outputs, labels, class_names),
+        "latency": measure_latency(candidate, images, batch_size, repeats),
+    }
+
+def quantize(name, sample_dir, modes=("int8", "float16"), limit=None, batch_size=SCAN_BATCH_SIZE, repeats=50):
+    from functions import scans
+
+    model_path, class_names_path, preprocess_name = SCAN_MODELS[name]
+    model, class_names = load_keras_classifier(model_path, class_names_path)
+    images, labels = load_samples(sample_dir, getattr(scans, preprocess_name), class_names, limit)
+    if not images:
+        raise ValueError(f"No {', '.join(IMAGE_EXTENSIONS)} images found in '{sample_dir}'")
+    print(f"{name}: {len(images)} sample images, {sum(label is not None for label in labels)} labelled")
+
+    reference_outputs = predict_all(model, images, batch_size)
+    report = {
+        "model": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "samples": {"dir": sample_dir, "images": len(images), "labelled": sum(label is not None for label in labels)},
+        "threads": TFLITE_THREADS,
+        "keras": {
+            "path": model_path,
+            "size_mb": os.path.getsize(model_path) / (1024 * 1024),
+            "accuracy": accuracy(reference_outputs, labels, class_names),
+            "latency": measure_latency(model, images, batch_size, repeats),
+        },
+    }
+    for mode in modes:
+        start = time.perf_counter()
+        converted = convert(model, mode, images)
+        convert_seconds = time.perf_counter() - start
+        path = tflite_path(model_path, mode)
+        with open(path + ".tmp", "wb") as f:
+            f.write(converted)
+        os.replace(path + ".tmp", path)
+        report[mode] = {
+            "path": path,
+            "size_mb": len(converted) / (1024 * 1024),
+            "convert_seconds": convert_seconds,
+            **compare(reference_outputs, TFLiteClassifier(path), images, labels, class_names, batch_size, repeats),
+        }
+
+    report_path = os.path.splitext(model_path)[0] + "_quantization_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{'backend':<9} {'size MB':>8} {'accuracy':>9} {'agree':>6} {'single ms':>10} {'batch ms/img':>13}")
+    for backend in ("keras", *modes):
+        entry = report[backend]
+        accuracy_text = "-" if entry["accuracy"] is None else f"{entry['accuracy']:.4f}"
+        agreement_text = f"{entry.get('top1_agreement', 1.0):.4f}"
+        print(
+            f"{backend:<9} {entry['size_mb']:>8.1f} {accuracy_text:>9} {agreement_text:>6} "
+            f"{entry['latency']['single_p50_ms']:>10.1f} {entry['latency']['batch_ms_per_image']:>13.1f}"
+        )
+    print(f"report: {report_path}")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantize a scan model to TFLite and compare it with the .h5 model.")
+    parser.add_argument("model", choices=sorted(SCAN_MODELS))
+    parser.add_argument("--samples", required=True, help="folder of sample images (optionally one sub-folder per class)")
+    parser.add_argument("--mode", nargs="+", choices=["int8", "float16"], default=["int8", "float16"])
+    parser.add_argument("--limit", type=int, help="use at most this many sample images")
+    parser.add_argument("--batch-size", type=int, default=SCAN_BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=50, help="timed single-image calls per backend")
+    args = parser.parse_args(argv)
+    quantize(args.model, args.samples, args.mode, args.limit, args.batch_size, args.repeats)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
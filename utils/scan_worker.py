@@ -0,0 +1,277 @@
+'''
+Out-of-process scan inference. Worker processes pull single images from a
+shared queue, group images for the same model into micro-batches (up to
+MEDAI_SCAN_MAX_BATCH images, waiting at most MEDAI_SCAN_MAX_WAIT_MS for a batch
+to fill) and run them through the model registry. Requests from every
+Streamlit session share the queue, so concurrent uploads are batched together
+instead of contending for TensorFlow inside each script thread.
+
+Enabled with MEDAI_SCAN_WORKERS=<number of worker processes> (0 = in-process).
+'''
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+from utils.scan_models import SCAN_BATCH_SIZE
+
+SCAN_WORKERS = int(os.environ.get("MEDAI_SCAN_WORKERS", "0"))
+MAX_BATCH_SIZE = int(os.environ.get("MEDAI_SCAN_MAX_BATCH", str(SCAN_BATCH_SIZE)))
+MAX_WAIT_MS = float(os.environ.get("MEDAI_SCAN_MAX_WAIT_MS", "20"))
+# How long a page waits for its results before giving up
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("MEDAI_SCAN_TIMEOUT", "300"))
+
+def next_batch(requests, backlog, max_batch_size, max_wait):
+    '''
+    Block for one item, then collect more items for the same model until the
+    batch is full or the deadline passes. Items for other models are kept in
+    backlog for the next batch. Returns None when asked to stop.
+    '''
+    first = backlog.popleft() if backlog else requests.get()
+    if first is None:
+        return None
+    batch = [first]
+    model_name = first[2]
+    skipped = deque()
+    while backlog:
+        item = backlog.popleft()
+        if item[2] == model_name and len(batch) < max_batch_size:
+            batch.append(item)
+        else:
+            skipped.append(item)
+    backlog.extend(skipped)
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            item = requests.get(timeout=timeout)
+        except queue.Empty:
+            break
+        if item is None:
+            # Finish this batch, then stop
+            requests.put(None)
+            break
+        if item[2] == model_name:
+            batch.append(item)
+        else:
+            backlog.append(item)
+    return batch
+
+def worker_main(requests, results, max_batch_size, max_wait, initializer=None):
+    '''Worker process loop. Items are (request_id, index, model_name, image, submitted_at).'''
+    from utils import model_registry
+    from utils.scan_models import pad_batch
+
+    if initializer:
+        model_registry.resolve(initializer)()
+    batch_ids = itertools.count(1)
+
+    def reply(batch, outputs, error, started, finished, batch_size):
+        # Every item of a batch carries its batch id, so the pool counts each batch once
+        batch_id = f"{os.getpid()}-{next(batch_ids)}"
+        for item, output in zip(batch, outputs):
+            results.put((item[0], item[1], output, error, {
+                "batch_id": batch_id,
+                "batch_size": batch_size,
+                "queue_seconds": started - item[4],
+                "inference_seconds": (finished - started) / len(batch),
+                "worker_pid": os.getpid(),
+            }))
+
+    backlog = deque()
+    while True:
+        batch = next_batch(requests, backlog, max_batch_size, max_wait)
+        if batch is None:
+            break
+        model_name = batch[0][2]
+        started = time.monotonic()
+        try:
+            model, _ = model_registry.get_model(model_name)
+            with model_registry.track_inference(model_name, items=len(batch)):
+                outputs = model.predict_on_batch(pad_batch([item[3] for item in batch], max_batch_size))
+            outputs = [output for output in outputs[:len(batch)]]
+            error = None
+        except Exception as e:
+            outputs = [None] * len(batch)
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        reply(batch, outputs, error, started, time.monotonic(), len(batch))
+    if backlog:
+        # next_batch serves the backlog before it takes the stop sentinel; answer
+        # anything left anyway, so no page waits for an item that never runs
+        now = time.monotonic()
+        reply(list(backlog), [None] * len(backlog), "RuntimeError: scan worker stopped", now, now, 0)
+
+class ScanInferencePool:
+    def __init__(self, workers=SCAN_WORKERS, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, initializer=None):
+        # spawn, not fork: TensorFlow state must not be copied into the workers
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        self.max_batch_size = max_batch_size
+        self.processes = [
+            context.Process(
+                target=worker_main,
+                args=(self.requests, self.results, max_batch_size, max_wait_ms / 1000, initializer),
+                name=f"scan-worker-{i}",
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._open_batches = {}
+        self.closed = False
+        self.submitted_items = 0
+        self.completed_items = 0
+        self.batch_sizes = deque(maxlen=1000)
+        self.latencies = deque(maxlen=1000)
+        self.queue_waits = deque(maxlen=1000)
+        self._collector = threading.Thread(target=self._collect, name="scan-results", daemon=True)
+        self._collector.start()
+
+    def submit(self, model_name, images):
+        '''Queue images for a model; returns a request id to poll.'''
+        if self.closed:
+            raise RuntimeError("The scan worker pool is closed")
+        request_id = next(self._ids)
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._pending[request_id] = {
+                "outputs": [None] * len(images),
+                "errors": [None] * len(images),
+                "infos": [None] * len(images),
+                "remaining": len(images),
+                "submitted_at": submitted_at,
+                "done": threading.Event(),
+            }
+            self.submitted_items += len(images)
+        for index, image in enumerate(images):
+            self.requests.put((request_id, index, model_name, image, submitted_at))
+        if not len(images):
+            self._pending[request_id]["done"].set()
+        return request_id
+
+    def _collect(self):
+        while True:
+            try:
+                request_id, index, output, error, info = self.results.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                self.completed_items += 1
+                remaining = self._open_batches.pop(info["batch_id"], None)
+                if remaining is None:
+                    # First item of this batch (items that never ran have batch_size 0)
+                    remaining = info["batch_size"]
+                    if remaining:
+                        self.batch_sizes.append(remaining)
+                if remaining > 1:
+                    self._open_batches[info["batch_id"]] = remaining - 1
+                self.queue_waits.append(info["queue_seconds"])
+                pending = self._pending.get(request_id)
+                if pending is None or pending["done"].is_set():
+                    continue
+                pending["outputs"][index] = output
+                pending["errors"][index] = error
+                pending["infos"][index] = info
+                pending["remaining"] -= 1
+                if pending["remaining"] == 0:
+                    pending["seconds"] = time.monotonic() - pending["submitted_at"]
+                    self.latencies.append(pending["seconds"])
+                    pending["done"].set()
+
+    def poll(self, request_id):
+        '''Return the finished result (and forget it), or None while still running.'''
+        with self._lock:
+            pending = self._pending.get(request_id)
+            if pending is None or not pending["done"].is_set():
+                return None
+            del self._pending[request_id]
+        return {key: pending[key] for key in ("outputs", "errors", "infos", "seconds") if key in pending}
+
+    def wait(self, request_id, timeout=None):
+        pending = self._pending.get(request_id)
+        if pending is not None:
+            pending["done"].wait(timeout)
+        return self.poll(request_id)
+
+    def cancel(self, request_id):
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def metrics(self):
+        with self._lock:
+            batch_sizes = list(self.batch_sizes)
+            latencies = sorted(self.latencies)
+            queue_waits = sorted(self.queue_waits)
+            return {
+                "workers": len(self.processes),
+                "workers_alive": sum(process.is_alive() for process in self.processes),
+                "queue_depth": self.submitted_items - self.completed_items,
+                "pending_requests": len(self._pending),
+                "submitted_items": self.submitted_items,
+                "completed_items": self.completed_items,
+                "max_batch_size": self.max_batch_size,
+                "mean_batch_size": sum(batch_sizes) / len(batch_sizes) if batch_sizes else None,
+                "p50_queue_ms": queue_waits[len(queue_waits) // 2] * 1000 if queue_waits else None,
+                "p50_request_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                "p99_request_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else None,
+            }
+
+    def close(self, timeout=5):
+        '''
+        Stop the workers once they have served everything queued so far, then
+        fail whatever is still unanswered (e.g. after a worker was terminated),
+        so no waiter blocks until its timeout.
+        '''
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self.processes:
+            self.requests.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        # Items nobody will read must not block interpreter exit on the queue's feeder thread
+        self.requests.cancel_join_thread()
+        # Let the collector pick up the results the workers sent before exiting
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline and not self.results.empty():
+            time.sleep(0.01)
+        time.sleep(0.05)
+        with self._lock:
+            for pending in self._pending.values():
+                if pending["done"].is_set():
+                    continue
+                for index, info in enumerate(pending["infos"]):
+                    if info is None:
+                        pending["errors"][index] = "RuntimeError: scan worker pool closed"
+                pending["remaining"] = 0
+                pending["seconds"] = time.monotonic() - pending["submitted_at"]
+                pending["done"].set()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_scan_pool():
+    '''The process-wide worker pool, started on first use; None when disabled.'''
+    global _pool
+    if SCAN_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ScanInferencePool()
+            atexit.register(_pool.close)
+        return _pool
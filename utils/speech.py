@@ -0,0 +1,345 @@
+import atexit
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+import numpy as np
+
+from utils import model_registry
+
+VOSK_MODEL_PATH = "vosk-model-small-en-us-0.15"  # Free English model
+# Idle recognizers kept per sample rate for reuse across recordings and sessions
+RECOGNIZER_POOL_SIZE = int(os.environ.get("MEDAI_VOSK_RECOGNIZERS", "4"))
+# The small English model is trained on 16 kHz audio; recordings are resampled to it
+MODEL_SAMPLE_RATE = 16000
+# Audio fed to the recognizer per call; smaller chunks give more frequent partial results
+CHUNK_SECONDS = 0.25
+# Recordings longer than this are split on silence and transcribed in a process pool
+LONG_AUDIO_SECONDS = float(os.environ.get("MEDAI_LONG_AUDIO_SECONDS", "120"))
+TRANSCRIPTION_WORKERS = int(os.environ.get("MEDAI_TRANSCRIPTION_WORKERS", str(os.cpu_count() or 1)))
+# Voice activity detection: RMS floor for speech, pause length that ends a segment, segment length cap
+VAD_MIN_RMS = 300.0
+VAD_MIN_SILENCE_MS = 500
+VAD_MAX_SEGMENT_SECONDS = 30.0
+# The noise floor is at most this fraction of the median frame energy
+VAD_NOISE_MEDIAN_RATIO = 0.25
+
+def load_vosk_model():
+    from vosk import Model
+
+    return Model(VOSK_MODEL_PATH)
+
+class RecognizerPool:
+    '''
+    KaldiRecognizers built on one shared Vosk model. A recognizer is used by
+    one transcription at a time, reset, and handed to the next, so only the
+    first recording pays for building the decoding graph.
+    '''
+
+    def __init__(self, model, max_idle=RECOGNIZER_POOL_SIZE):
+        self.model = model
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def recognizer(self, sample_rate):
+        from vosk import KaldiRecognizer
+
+        with self._lock:
+            idle = self._idle.setdefault(sample_rate, [])
+            rec = idle.pop() if idle else None
+            if rec is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if rec is None:
+            rec = KaldiRecognizer(self.model, sample_rate)
+        # Not returned to the pool if the transcription fails part-way
+        yield rec
+        rec.Reset()
+        with self._lock:
+            if len(self._idle[sample_rate]) < self.max_idle:
+                self._idle[sample_rate].append(rec)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": {rate: len(idle) for rate, idle in self._idle.items()},
+            }
+
+# (audio seconds, processing seconds) of recent transcriptions
+_recent = deque(maxlen=1000)
+
+def get_recognizer_pool():
+    '''
+    The pool for the currently loaded Vosk model. The registry holds it with
+    the model, so it is rebuilt after a reload and freed when the model is evicted.
+    '''
+    return model_registry.get_attached("vosk_en", "recognizers", RecognizerPool)
+
+def warmup_recognizers(model):
+    '''Registry warmup hook: have a recognizer ready before the first recording.'''
+    with get_recognizer_pool().recognizer(MODEL_SAMPLE_RATE):
+        pass
+
+def read_wav(audio_bytes):
+    '''
+    Parse WAV bytes in memory into mono int16 samples and their sample rate.
+    Multi-channel audio is averaged down; 8- and 32-bit PCM are rescaled.
+    '''
+    with wave.open(io.BytesIO(memoryview(audio_bytes)), "rb") as wf:
+        channels, sample_width, sample_rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2")
+    elif sample_width == 4:
+        samples = (np.frombuffer(frames, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width * 8} bits")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+def wav_duration(audio_bytes):
+    with wave.open(io.BytesIO(memoryview(audio_bytes)), "rb") as wf:
+        return wf.getnframes() / wf.getframerate() if wf.getframerate() else 0.0
+
+def resample(samples, rate, target_rate=MODEL_SAMPLE_RATE):
+    '''Linear-interpolation resampling, with a moving-average low-pass first when downsampling.'''
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    signal = samples.astype(np.float32)
+    factor = rate / target_rate
+    if factor >= 2:
+        width = int(round(factor))
+        signal = np.convolve(signal, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    positions = np.arange(int(len(signal) / factor)) * factor
+    resampled = np.interp(positions, np.arange(len(signal)), signal)
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+def recognize_pcm(rec, pcm, chunk_bytes, partials=True):
+    '''Feed 16-bit PCM to a recognizer chunk by chunk, yielding ("partial" | "final", text).'''
+    for offset in range(0, len(pcm), chunk_bytes):
+        if rec.AcceptWaveform(bytes(pcm[offset:offset + chunk_bytes])):
+            phrase = json.loads(rec.Result()).get("text", "")
+            if phrase:
+                yield "final", phrase
+        elif partials:
+            partial = json.loads(rec.PartialResult()).get("partial", "")
+            if partial:
+                yield "partial", partial
+    phrase = json.loads(rec.FinalResult()).get("text", "")
+    if phrase:
+        yield "final", phrase
+
+def stream_transcription(audio_bytes, chunk_seconds=CHUNK_SECONDS):
+    '''
+    Transcribe WAV bytes without touching disk, yielding results as they are
+    recognized: {"partial": text so far} while a phrase is in progress,
+    {"final": phrase} when one completes, and finally {"text": the full
+    transcript, "info": timings including the real-time factor}.
+    '''
+    # Model loading (first use only) is reported by the registry, not in the real-time factor
+    pool = get_recognizer_pool()
+    start = time.perf_counter()
+    samples, rate = read_wav(audio_bytes)
+    audio_seconds = len(samples) / rate if rate else 0.0
+    samples = resample(samples, rate)
+    pcm = memoryview(samples.tobytes())
+    chunk_bytes = int(MODEL_SAMPLE_RATE * chunk_seconds) * 2
+    phrases = []
+    with model_registry.track_inference("vosk_en"), pool.recognizer(MODEL_SAMPLE_RATE) as rec:
+        for kind, text in recognize_pcm(rec, pcm, chunk_bytes):
+            if kind == "final":
+                phrases.append(text)
+                yield {"final": text}
+            else:
+                yield {"partial": " ".join(phrases + [text])}
+    seconds = time.perf_counter() - start
+    _recent.append((audio_seconds, seconds))
+    yield {
+        "text": " ".join(phrases),
+        "info": {
+            "audio_seconds": audio_seconds,
+            "sample_rate": rate,
+            "seconds": seconds,
+            "real_time_factor": seconds / audio_seconds if audio_seconds else None,
+        },
+    }
+
+def transcribe(audio_bytes):
+    '''Transcribe WAV bytes in memory; returns the text and timing info.'''
+    for result in stream_transcription(audio_bytes):
+        if "text" in result:
+            return result["text"], result["info"]
+
+def detect_speech_segments(samples, rate=MODEL_SAMPLE_RATE, frame_ms=30, min_silence_ms=VAD_MIN_SILENCE_MS,
+                           padding_ms=200, min_speech_ms=150, max_segment_seconds=VAD_MAX_SEGMENT_SECONDS):
+    '''
+    Energy-based voice activity detection. Frames louder than a threshold
+    derived from the recording's noise floor count as speech; pauses shorter
+    than min_silence_ms stay inside a segment. Segments are padded, and any
+    longer than max_segment_seconds are cut at their quietest frame so work
+    spreads evenly across processes. Returns (start, end) sample offsets.
+    '''
+    frame = max(1, int(rate * frame_ms / 1000))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return [(0, len(samples))] if len(samples) else []
+    frames = samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+    energy = np.sqrt((frames ** 2).mean(axis=1))
+    # Noise floor from the quietest frames, capped relative to the median so a
+    # recording that is almost all speech does not put the floor at speech level
+    noise_floor = min(float(np.percentile(energy, 5)), float(np.median(energy)) * VAD_NOISE_MEDIAN_RATIO)
+    threshold = max(VAD_MIN_RMS, noise_floor * 3)
+    speech = energy > threshold
+
+    # Close pauses shorter than min_silence_ms
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.view(np.int8), [0]))))
+    runs = list(zip(edges[::2], edges[1::2]))
+    merged = []
+    for start, end in runs:
+        if merged and (start - merged[-1][1]) * frame_ms < min_silence_ms:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    # Pad, then join segments whose padding overlaps
+    pad = padding_ms // frame_ms
+    padded = []
+    for start, end in merged:
+        if (end - start) * frame_ms < min_speech_ms:
+            continue
+        start, end = max(0, start - pad), min(n_frames, end + pad)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    if not padded and float(energy.max()) > VAD_MIN_RMS:
+        # Not silent, but no pauses to split on: transcribe the whole recording
+        padded = [(0, n_frames)]
+
+    max_frames = max(1, int(max_segment_seconds * 1000 / frame_ms))
+    segments = []
+    for start, end in padded:
+        while end - start > max_frames:
+            # Cut at the quietest frame in the second half of the window
+            window = energy[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, end))
+    return [(start * frame, len(samples) if end == n_frames else end * frame) for start, end in segments]
+
+def _transcribe_segment(index, pcm):
+    '''Process-pool task: transcribe one segment with this process's own model and recognizer.'''
+    pool = get_recognizer_pool()
+    with pool.recognizer(MODEL_SAMPLE_RATE) as rec:
+        phrases = [text for _, text in recognize_pcm(rec, memoryview(pcm), len(pcm), partials=False)]
+    return index, " ".join(phrases), os.getpid()
+
+def _load_worker_model():
+    model_registry.get_model("vosk_en")
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_transcription_executor(workers=TRANSCRIPTION_WORKERS):
+    '''
+    Process pool for long recordings, started on first use and kept for the
+    life of the app. Each worker loads its own copy of the Vosk model.
+    '''
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_worker_model,
+            )
+            atexit.register(_executors[workers].shutdown, cancel_futures=True)
+        return _executors[workers]
+
+def transcribe_long(audio_bytes, workers=TRANSCRIPTION_WORKERS, on_segment=None):
+    '''
+    Long-recording mode: split on silence, transcribe the segments in a
+    process pool, and merge them in order. Returns the text, the segments
+    with start/end times in seconds, and timing info. on_segment is called
+    with each segment as it completes (in completion order).
+    '''
+    start = time.perf_counter()
+    samples, rate = read_wav(audio_bytes)
+    audio_seconds = len(samples) / rate if rate else 0.0
+    samples = resample(samples, rate)
+    bounds = detect_speech_segments(samples)
+    vad_seconds = time.perf_counter() - start
+    segments = [
+        {"start": begin / MODEL_SAMPLE_RATE, "end": end / MODEL_SAMPLE_RATE, "text": ""}
+        for begin, end in bounds
+    ]
+    pids = set()
+    if workers <= 1 or len(bounds) <= 1:
+        for index, (begin, end) in enumerate(bounds):
+            _, segments[index]["text"], pid = _transcribe_segment(index, samples[begin:end].tobytes())
+            pids.add(pid)
+            if on_segment:
+                on_segment(segments[index])
+    else:
+        executor = get_transcription_executor(workers)
+        futures = [
+            executor.submit(_transcribe_segment, index, samples[begin:end].tobytes())
+            for index, (begin, end) in enumerate(bounds)
+        ]
+        for future in as_completed(futures):
+            index, text, pid = future.result()
+            segments[index]["text"] = text
+            pids.add(pid)
+            if on_segment:
+                on_segment(segments[index])
+    seconds = time.perf_counter() - start
+    _recent.append((audio_seconds, seconds))
+    return {
+        "text": " ".join(segment["text"] for segment in segments if segment["text"]),
+        "segments": segments,
+        "info": {
+            "audio_seconds": audio_seconds,
+            "speech_seconds": sum(segment["end"] - segment["start"] for segment in segments),
+            "sample_rate": rate,
+            "segments": len(segments),
+            "workers": len(pids),
+            "vad_seconds": vad_seconds,
+            "seconds": seconds,
+            "real_time_factor": seconds / audio_seconds if audio_seconds else None,
+        },
+    }
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+def speech_metrics():
+    '''Model load time, recognizer reuse and real-time factor of recent transcriptions.'''
+    recent = list(_recent)
+    pool = model_registry.peek_attached("vosk_en", "recognizers")
+    audio_seconds = sum(audio for audio, _ in recent)
+    processing_seconds = sum(seconds for _, seconds in recent)
+    return {
+        "model": model_registry.model_metrics()["models"].get("vosk_en"),
+        "recognizers": pool.stats() if pool is not None else None,
+        "transcriptions": len(recent),
+        "audio_seconds": audio_seconds,
+        "processing_seconds": processing_seconds,
+        "real_time_factor": processing_seconds / audio_seconds if audio_seconds else None,
+    }
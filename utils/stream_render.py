@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Streamed text is re-rendered at most every RENDER_INTERVAL_MS, or sooner
+# once RENDER_MIN_CHARS new characters have arrived
+RENDER_INTERVAL_MS = float(os.environ.get("MEDAI_STREAM_RENDER_MS", "50"))
+RENDER_MIN_CHARS = int(os.environ.get("MEDAI_STREAM_RENDER_CHARS", "200"))
+
+_recent = deque(maxlen=1000)
+_recent_lock = threading.Lock()
+
+class StreamRenderer:
+    '''
+    Coalesces streamed text into throttled placeholder.markdown calls. Each
+    call re-sends the whole text, so rendering every token costs quadratic
+    bytes over the websocket for long answers. append() adds a delta,
+    replace() swaps in new text (speech partials); close() renders whatever
+    is still pending and records the render count.
+    '''
+
+    def __init__(self, placeholder, interval_ms=None, min_chars=None, format=None):
+        self.placeholder = placeholder
+        self.interval = (RENDER_INTERVAL_MS if interval_ms is None else interval_ms) / 1000
+        self.min_chars = RENDER_MIN_CHARS if min_chars is None else min_chars
+        self.format = format
+        self.renders = 0
+        self.updates = 0
+        self._parts = []
+        self._pending_chars = 0
+        self._started = time.perf_counter()
+        self._last_render = float("-inf")
+        self._closed = False
+        self._final = None
+
+    @property
+    def text(self):
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def append(self, delta):
+        if not delta:
+            return
+        self._parts.append(delta)
+        self._pending(len(delta))
+
+    def replace(self, text):
+        self._parts = [text]
+        self._pending(max(1, len(text)))
+
+    def _pending(self, chars):
+        self.updates += 1
+        self._pending_chars += chars
+        if self._pending_chars >= self.min_chars or time.perf_counter() - self._last_render >= self.interval:
+            self.render()
+
+    def render(self, text=None):
+        text = self.text if text is None else text
+        self.placeholder.markdown(self.format(text) if self.format else text)
+        self.renders += 1
+        self._pending_chars = 0
+        self._last_render = time.perf_counter()
+
+    def close(self, final=None):
+        '''Render the pending text, or final (unformatted) in its place; returns what was rendered.'''
+        if self._closed:
+            return self.text if self._final is None else self._final
+        self._closed = True
+        self._final = final
+        if final is not None:
+            self.placeholder.markdown(final)
+            self.renders += 1
+        elif self._pending_chars:
+            self.render()
+        with _recent_lock:
+            _recent.append({
+                "renders": self.renders,
+                "updates": self.updates,
+                "chars": len(self.text if final is None else final),
+                "seconds": time.perf_counter() - self._started,
+            })
+        return self.text if final is None else final
+
+def render_metrics():
+    '''Render calls per streamed response, against the deltas that would each have been a render.'''
+    with _recent_lock:
+        recent = list(_recent)
+    renders = sum(entry["renders"] for entry in recent)
+    updates = sum(entry["updates"] for entry in recent)
+    return {
+        "responses": len(recent),
+        "renders": renders,
+        "updates": updates,
+        "renders_per_response": renders / len(recent) if recent else None,
+        "updates_per_render": updates / renders if renders else None,
+        "last": recent[-1] if recent else None,
+    }
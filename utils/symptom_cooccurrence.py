@@ -0,0 +1,95 @@
+import csv
+import hashlib
+from functools import lru_cache
+import numpy as np
+
+from utils.symptom_vocabulary import CSV_PATH, load_vocabulary
+
+COOCCURRENCE_PATH = "./models/pkl/symptom_cooccurrence.npz"
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def build_cooccurrence(csv_path=CSV_PATH):
+    '''
+    Count how often every pair of symptoms appears in the same row and
+    store P(b | a) as a CSR matrix (indptr, indices, data) without the diagonal.
+    '''
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [i for i, name in enumerate(header) if name != "prognosis" and name.strip()]
+        rows = [[row[i] == "1" for i in positions] for row in reader if row]
+    X = np.array(rows, dtype=np.int32)
+    counts = X.T @ X
+    support = np.diag(counts).copy()
+    np.fill_diagonal(counts, 0)
+    conditional = counts / np.maximum(support, 1)[:, np.newaxis]
+    indptr = np.zeros(len(support) + 1, dtype=np.int32)
+    indices, data, pair_counts = [], [], []
+    for a in range(len(support)):
+        related = np.nonzero(counts[a])[0]
+        indices.append(related)
+        data.append(conditional[a, related])
+        pair_counts.append(counts[a, related])
+        indptr[a + 1] = indptr[a] + len(related)
+    return {
+        "indptr": indptr,
+        "indices": np.concatenate(indices).astype(np.int32),
+        "data": np.concatenate(data).astype(np.float32),
+        "counts": np.concatenate(pair_counts).astype(np.int32),
+        "support": support.astype(np.int32),
+        "rows": np.array(len(X)),
+        "source_sha256": np.array(file_digest(csv_path)),
+    }
+
+def write_cooccurrence(csv_path=CSV_PATH, path=COOCCURRENCE_PATH):
+    arrays = build_cooccurrence(csv_path)
+    np.savez_compressed(path, **arrays)
+    return arrays
+
+@lru_cache(maxsize=None)
+def load_cooccurrence(csv_path=CSV_PATH, path=COOCCURRENCE_PATH):
+    '''
+    Load the precomputed index once per process and expand it to a dense
+    conditional-probability matrix for lookups. Rebuilt from the CSV when
+    the file is missing or was built from different data.
+    '''
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+        if str(arrays["source_sha256"]) != file_digest(csv_path):
+            print(f"Warning: '{path}' is stale, rebuilding from '{csv_path}'.")
+            arrays = build_cooccurrence(csv_path)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Warning: could not load '{path}' ({e}), rebuilding from '{csv_path}'.")
+        arrays = build_cooccurrence(csv_path)
+    n = len(arrays["support"])
+    conditional = np.zeros((n, n), dtype=np.float32)
+    rows = np.repeat(np.arange(n), np.diff(arrays["indptr"]))
+    conditional[rows, arrays["indices"]] = arrays["data"]
+    return conditional, arrays["support"]
+
+@lru_cache(maxsize=4096)
+def _related(selected, top_n):
+    vocabulary = load_vocabulary()
+    columns = vocabulary["columns"]
+    conditional, support = load_cooccurrence()
+    indices = [vocabulary["index"][s] for s in selected if s in vocabulary["index"]]
+    if indices:
+        # Average P(candidate | s) over the selected symptoms
+        scores = conditional[indices].mean(axis=0)
+        scores[indices] = 0.0
+    else:
+        scores = support / max(int(support.max()), 1)
+    top = np.argsort(-scores, kind="stable")[:top_n]
+    return tuple((columns[i], float(scores[i])) for i in top if scores[i] > 0)
+
+def related_symptoms(selected, top_n=5):
+    '''Top symptoms that co-occur with the current selection, as (symptom, score) pairs.'''
+    return list(_related(frozenset(selected), top_n))
+
+if __name__ == "__main__":
+    arrays = write_cooccurrence()
+    print(f"Wrote {len(arrays['data'])} symptom pairs from {int(arrays['rows'])} rows to {COOCCURRENCE_PATH}")
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+
+CSV_PATH = "./models/csv/Training.csv"
+VOCABULARY_PATH = "./models/pkl/symptom_vocabulary.json"
+
+def header_digest(csv_path=CSV_PATH):
+    '''SHA-256 of the CSV header line; the vocabulary depends on nothing else.'''
+    with open(csv_path, "rb") as f:
+        return hashlib.sha256(f.readline().rstrip(b"\r\n")).hexdigest()
+
+def make_label(column):
+    '''Human readable label, e.g. "spotting_ urination" -> "Spotting urination".'''
+    name, _, duplicate = column.partition(".")
+    label = re.sub(r"[\s_]+", " ", name).strip()
+    label = label[:1].upper() + label[1:]
+    if duplicate.isdigit():
+        label = f"{label} ({int(duplicate) + 1})"
+    return label
+
+def build_vocabulary(csv_path=CSV_PATH):
+    '''
+    Build the vocabulary from the CSV header. Column names are read with pandas
+    so they match the training columns exactly (e.g. "fluid_overload.1").
+    '''
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, nrows=0)
+    columns = [col for col in df.columns if col != "prognosis" and "Unnamed" not in col]
+    return {
+        "source": os.path.basename(csv_path),
+        "header_sha256": header_digest(csv_path),
+        "columns": columns,
+        "index": {col: idx for idx, col in enumerate(columns)},
+        "labels": {col: make_label(col) for col in columns},
+    }
+
+def write_vocabulary(csv_path=CSV_PATH, vocabulary_path=VOCABULARY_PATH):
+    vocabulary = build_vocabulary(csv_path)
+    with open(vocabulary_path, "w") as f:
+        json.dump(vocabulary, f, indent=2)
+    return vocabulary
+
+def is_stale(vocabulary, csv_path=CSV_PATH):
+    if not os.path.exists(csv_path):
+        return False
+    return vocabulary.get("header_sha256") != header_digest(csv_path)
+
+@lru_cache(maxsize=None)
+def load_vocabulary(csv_path=CSV_PATH, vocabulary_path=VOCABULARY_PATH):
+    '''
+    Load the precompiled vocabulary once per process. Falls back to reading the
+    CSV header when the file is missing, unreadable or older than the CSV.
+    '''
+    try:
+        with open(vocabulary_path) as f:
+            vocabulary = json.load(f)
+        if not is_stale(vocabulary, csv_path):
+            return vocabulary
+        print(f"Warning: '{vocabulary_path}' is stale, rebuilding from '{csv_path}'.")
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not load '{vocabulary_path}' ({e}), rebuilding from '{csv_path}'.")
+    return build_vocabulary(csv_path)
+
+if __name__ == "__main__":
+    vocabulary = write_vocabulary()
+    print(f"Wrote {len(vocabulary['columns'])} symptoms to {VOCABULARY_PATH}")
@@ -0,0 +1,228 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+from utils.symptom_vocabulary import CSV_PATH
+
+OUTPUT_DIR = "./models/pkl"
+MODEL_FILE = "disease_prediction_model.pkl"
+LABEL_ENCODER_FILE = "label_encoder.pkl"
+METRICS_FILE = "disease_prediction_metrics.json"
+LATENCY_FILE = "disease_prediction_latency.json"
+
+def candidate_models(seed):
+    '''Model families compared during selection; all can be compiled to NumPy.'''
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.naive_bayes import BernoulliNB, MultinomialNB
+    from sklearn.tree import DecisionTreeClassifier
+
+    return {
+        "decision_tree": DecisionTreeClassifier(random_state=seed),
+        "random_forest": RandomForestClassifier(n_estimators=100, random_state=seed, n_jobs=1),
+        "extra_trees": ExtraTreesClassifier(n_estimators=100, random_state=seed, n_jobs=1),
+        "logistic_regression": LogisticRegression(max_iter=2000),
+        "bernoulli_nb": BernoulliNB(),
+        "multinomial_nb": MultinomialNB(),
+    }
+
+def load_training_data(csv_path=CSV_PATH):
+    '''
+    Stream the CSV row by row and keep each distinct (symptoms, prognosis)
+    pair once. Returns the feature matrix, labels and how many rows were read.
+    '''
+    digest = hashlib.sha256()
+    unique_rows = {}
+    total_rows = 0
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        digest.update(",".join(header).encode())
+        label_col = header.index("prognosis")
+        feature_cols = [i for i, name in enumerate(header) if i != label_col and name.strip()]
+        for row in reader:
+            if not row:
+                continue
+            total_rows += 1
+            digest.update(",".join(row).encode())
+            features = bytes(int(row[i] or 0) for i in feature_cols)
+            unique_rows.setdefault((features, row[label_col]), None)
+    X = np.array([np.frombuffer(features, dtype=np.uint8) for features, _ in unique_rows], dtype=np.float64)
+    y = np.array([label for _, label in unique_rows])
+    return X, y, total_rows, digest.hexdigest()
+
+def evaluate_fold(name, estimator, X, y, train_idx, test_idx):
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score, f1_score, log_loss
+
+    model = clone(estimator)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    proba = model.predict_proba(X[test_idx])
+    predicted = model.classes_[proba.argmax(axis=1)]
+    return {
+        "model": name,
+        "accuracy": accuracy_score(y[test_idx], predicted),
+        "macro_f1": f1_score(y[test_idx], predicted, average="macro"),
+        "log_loss": log_loss(y[test_idx], proba, labels=model.classes_),
+        "fit_seconds": fit_seconds,
+    }
+
+def select_model(candidates, X, y, folds, seed, n_jobs):
+    '''Cross-validate every candidate; (candidate, fold) pairs run in parallel.'''
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    n_splits = max(2, min(folds, np.bincount(y).min()))
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    splits = list(splitter.split(X, y))
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(name, estimator, X, y, train_idx, test_idx)
+        for name, estimator in candidates.items()
+        for train_idx, test_idx in splits
+    )
+    summary = {}
+    for name in candidates:
+        scores = [r for r in results if r["model"] == name]
+        summary[name] = {
+            metric: {
+                "mean": float(np.mean([r[metric] for r in scores])),
+                "std": float(np.std([r[metric] for r in scores])),
+            }
+            for metric in ("accuracy", "macro_f1", "log_loss", "fit_seconds")
+        }
+    # Highest accuracy wins; log loss breaks ties between perfect scorers
+    best = max(summary, key=lambda name: (summary[name]["accuracy"]["mean"], -summary[name]["log_loss"]["mean"]))
+    return best, summary, n_splits
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+def profile_latency(model, X, repeats=200, batch_size=256):
+    '''Single-row and batch predict_proba timings for a fitted model.'''
+    rng = np.random.default_rng(0)
+    rows = X[rng.integers(0, len(X), size=repeats)]
+    model.predict_proba(rows[:1])
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row[np.newaxis, :])
+        samples.append(time.perf_counter() - start)
+    batch = X[rng.integers(0, len(X), size=batch_size)]
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "single_row_p50_ms": percentile_ms(samples, 50),
+        "single_row_p99_ms": percentile_ms(samples, 99),
+        "batch_size": batch_size,
+        "batch_ms": batch_seconds * 1000,
+        "batch_rows_per_second": batch_size / batch_seconds,
+    }
+
+def train(csv_path=CSV_PATH, output_dir=OUTPUT_DIR, folds=5, seed=42, n_jobs=-1, models=None):
+    import joblib
+    import sklearn
+    from sklearn.preprocessing import LabelEncoder
+    from utils.disease_model_export import CompiledModel, compile_model
+    from utils.disease_prediction import artifact_version as file_version
+
+    start = time.perf_counter()
+    X, labels, total_rows, data_sha256 = load_training_data(csv_path)
+    load_seconds = time.perf_counter() - start
+    label_encoder = LabelEncoder().fit(labels)
+    y = label_encoder.transform(labels)
+    print(f"Loaded {total_rows} rows, {len(X)} unique, {len(label_encoder.classes_)} diseases")
+
+    candidates = candidate_models(seed)
+    if models:
+        candidates = {name: candidates[name] for name in models}
+    start = time.perf_counter()
+    best, summary, n_splits = select_model(candidates, X, y, folds, seed, n_jobs)
+    selection_seconds = time.perf_counter() - start
+    print(f"Selected {best} ({summary[best]['accuracy']['mean']:.4f} mean CV accuracy over {n_splits} folds)")
+
+    start = time.perf_counter()
+    model = candidates[best].fit(X, y)
+    final_fit_seconds = time.perf_counter() - start
+
+    # Versioned run directory; the serving copies in output_dir are replaced last
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + "-" + data_sha256[:8]
+    run_dir = os.path.join(output_dir, "runs", version)
+    os.makedirs(run_dir, exist_ok=True)
+    model_path = os.path.join(run_dir, MODEL_FILE)
+    label_encoder_path = os.path.join(run_dir, LABEL_ENCODER_FILE)
+    joblib.dump(model, model_path)
+    joblib.dump(label_encoder, label_encoder_path)
+    artifact_version = file_version([model_path, label_encoder_path])
+    compiled_path = os.path.join(run_dir, "disease_prediction_model.npz")
+    compile_report = compile_model(model, label_encoder, X, artifact_version, compiled_path)
+
+    latency = {"version": version, "sklearn": profile_latency(model, X)}
+    if compile_report["equivalent"]:
+        latency["numpy"] = profile_latency(CompiledModel.load(compiled_path), X)
+    metrics = {
+        "version": version,
+        "artifact_version": artifact_version,
+        "selected_model": best,
+        "selected_params": model.get_params(),
+        "cv_folds": n_splits,
+        "seed": seed,
+        "cv": summary,
+        "data": {
+            "csv": os.path.basename(csv_path),
+            "sha256": data_sha256,
+            "rows": total_rows,
+            "unique_rows": int(len(X)),
+            "classes": int(len(label_encoder.classes_)),
+        },
+        "timings": {
+            "load_seconds": load_seconds,
+            "selection_seconds": selection_seconds,
+            "final_fit_seconds": final_fit_seconds,
+        },
+        "compiled_model": compile_report,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scikit-learn": sklearn.__version__,
+        },
+    }
+    with open(os.path.join(run_dir, METRICS_FILE), "w") as f:
+        json.dump(metrics, f, indent=2, default=str)
+    with open(os.path.join(run_dir, LATENCY_FILE), "w") as f:
+        json.dump(latency, f, indent=2)
+
+    for name in (MODEL_FILE, LABEL_ENCODER_FILE, METRICS_FILE, LATENCY_FILE, "disease_prediction_model.npz"):
+        source = os.path.join(run_dir, name)
+        if os.path.exists(source):
+            # Copy then rename so a running app never reads a half-written file
+            target = os.path.join(output_dir, name)
+            shutil.copyfile(source, target + ".tmp")
+            os.replace(target + ".tmp", target)
+    print(f"Wrote version {version} to {output_dir} (archived in {run_dir})")
+    return metrics
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the symptom-based disease prediction model.")
+    parser.add_argument("--csv", default=CSV_PATH, help="training data")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="where the serving artifacts are written")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel workers for model selection (-1 = all cores)")
+    parser.add_argument("--models", nargs="+", choices=sorted(candidate_models(0)), help="restrict the candidates")
+    args = parser.parse_args(argv)
+    train(args.csv, args.output_dir, args.folds, args.seed, args.n_jobs, args.models)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())